@@ -0,0 +1,89 @@
+from dataclasses import dataclass
+import shutil
+import os
+
+STD_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'std')
+
+@dataclass
+class Corpus:
+    name: str
+    modules: int=1
+    structs: int=10
+    unions: int=10
+    depth: int=4
+    generics: int=10
+    body: int=10
+    operators: int=0
+    branches: int=0
+
+    def generate_module(self, imports: tuple[str]=()):
+        declarations = ['import std.err', *(f'import {module_name}' for module_name in imports)]
+
+        for struct_index in range(self.structs):
+            # Each struct nests the previous ones, so attribute chains are `depth` hops long
+            declarations.append(f'struct Leaf{struct_index} {{\n    value: int,\n    other: int\n}}')
+
+            for level in range(1, self.depth + 1):
+                inner = f'Leaf{struct_index}' if level == 1 else f'Node{struct_index}_{level - 1}'
+                declarations.append(f'struct Node{struct_index}_{level} {{\n    inner: {inner},\n    value: int\n}}')
+
+            chain = '.'.join(['node', *(['inner'] * self.depth), 'value'])
+            declarations.append(f'fun Node{struct_index}_{self.depth}.deep(self: Node{struct_index}_{self.depth}) : int {{\n    return self.value\n}}')
+            declarations.append(f'fun walk{struct_index}(node: Node{struct_index}_{self.depth}) : int {{\n    return {chain} + node.deep()\n}}')
+
+        for union_index in range(self.unions):
+            declarations.append(f'union Number{union_index} {{\n    integer: int,\n    real: float\n}}')
+            declarations.append(f'fun is_integer{union_index}(number: Number{union_index}) : int {{\n    if number.integer? {{\n        return number.integer\n    }}\n\n    return 0\n}}')
+
+        for generic_index in range(self.generics):
+            declarations.append(f'struct Box{generic_index}[T] {{\n    value: T\n}}')
+            declarations.append(f'fun Box{generic_index}.get[T](self: Box{generic_index}[T]) : T {{\n    return self.value\n}}')
+            declarations.append(f'fun divide{generic_index}(a: int, b: int) : err.Result[int, str] {{\n    if b == 0 {{\n        return err.Result[int, str] {{ "ZeroDivisionError: Divide by zero" }}\n    }}\n\n    return err.Result[int, str] {{ a / b }}\n}}')
+            declarations.append(f'fun unbox{generic_index}(box: Box{generic_index}[int]) : int {{\n    let result = divide{generic_index}(box.get[int](), 2)\n\n    return result.unwrap[int, str]()\n}}')
+
+        lines = [f'    let value{line} = a * {line} + b - value{line - 1}' if line else '    let value0 = a + b' for line in range(self.body)]
+        declarations.append('fun long_body(a: int, b: int) : int {\n' + '\n'.join(lines) + f'\n\n    return value{self.body - 1}\n}}')
+
+        # Machine generated shapes, one long operator chain and ifs nested inside each other
+        if self.operators:
+            chain = ' + '.join(['a', *(str(operand) for operand in range(self.operators))])
+            declarations.append(f'fun long_chain(a: int) : int {{\n    return {chain}\n}}')
+
+        if self.branches:
+            opening = ''.join(f'if a == {branch} {{\n' for branch in range(self.branches))
+            declarations.append(f'fun nested_branches(a: int) : int {{\n{opening}return a\n{"}" * self.branches}\n\n    return 0\n}}')
+
+        for module_name in imports:
+            declarations.append(f'fun call_{module_name.replace(".", "_")}(a: int) : int {{\n    return {module_name.split(".")[-1]}.long_body(a, a)\n}}')
+
+        return '\n\n'.join(declarations)
+
+    def generate_project(self, directory: str):
+        # Libraries import each other in a chain, and the main module imports every one of them
+        shutil.copytree(STD_DIRECTORY, os.path.join(directory, 'std'), dirs_exist_ok=True)
+        os.makedirs(os.path.join(directory, 'lib'), exist_ok=True)
+
+        libraries = [f'lib.module{index}' for index in range(self.modules - 1)]
+
+        for index, library in enumerate(libraries):
+            with open(os.path.join(directory, 'lib', f'module{index}.gullian'), 'w') as file:
+                file.write(self.generate_module(tuple(libraries[:index])))
+
+        main_filepath = os.path.join(directory, 'main.gullian')
+
+        with open(main_filepath, 'w') as file:
+            file.write(self.generate_module(tuple(libraries)))
+
+        return main_filepath
+
+CORPORA = {
+    'small': Corpus('small'),
+    'structs': Corpus('structs', structs=200, unions=200, generics=0, depth=2),
+    'attributes': Corpus('attributes', structs=50, unions=0, generics=0, depth=32),
+    'generics': Corpus('generics', structs=0, unions=0, generics=200),
+    'imports': Corpus('imports', modules=40, structs=5, unions=5, generics=5),
+    'bodies': Corpus('bodies', structs=0, unions=0, generics=0, body=5000),
+    'operators': Corpus('operators', structs=0, unions=0, generics=0, operators=5000),
+    'branches': Corpus('branches', structs=0, unions=0, generics=0, branches=2000),
+    'paths': Corpus('paths', structs=5, unions=0, generics=0, depth=500),
+}
@@ -0,0 +1,43 @@
+import tracemalloc
+import argparse
+import sys
+import gc
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gullian_parser.source import Source
+from gullian_parser.lexer import Lexer
+from gullian_parser.parser import Parser
+
+from gullian_checker.checker import Module, Checker
+
+from corpus import Corpus
+
+def measure(size: int):
+    module = Module.new('memory')
+
+    corpus = Corpus('memory', structs=size, unions=size, generics=0, depth=2)
+
+    tokens = tuple(Lexer(Source(corpus.generate_module()), module.name).lex())
+    asts = tuple(Parser(Source(tokens), module.name).parse())
+
+    gc.collect()
+    tracemalloc.start()
+
+    checker = Checker.new(module)
+    checked = list(checker.check(asts))
+
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'size': size, 'declarations': len(checked), 'retained': current, 'peak': peak}
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser(description='Measures the memory allocated by checking a large synthetic module')
+    argument_parser.add_argument('--size', type=int, default=2000, help='number of struct chains and unions to generate')
+
+    arguments = argument_parser.parse_args()
+    result = measure(arguments.size)
+
+    print(f"checked {result['declarations']} declarations, retained {result['retained'] / 1e6:.2f}MB, peak {result['peak'] / 1e6:.2f}MB")
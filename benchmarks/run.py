@@ -0,0 +1,120 @@
+import subprocess
+import statistics
+import argparse
+import tempfile
+import platform
+import time
+import json
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gullian_parser.source import Source
+from gullian_parser.lexer import Lexer
+from gullian_parser.parser import Parser, Import
+
+from gullian_checker.checker import Module, Checker
+from gullian_checker.session import Session
+
+from corpus import CORPORA, Corpus
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def measure(filepath: str):
+    phases = dict()
+
+    with open(filepath) as file:
+        text = file.read()
+
+    started = time.perf_counter()
+    tokens = tuple(Lexer(Source(text), 'main').lex())
+    phases['lex'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    asts = tuple(Parser(Source(tokens), 'main').parse())
+    phases['parse'] = time.perf_counter() - started
+
+    # Imports are resolved by a fresh session, so every imported module is lexed, parsed and checked here
+    checker = Checker.new(Module.new('main'), Session.new())
+
+    started = time.perf_counter()
+    checker.check_signatures([ast for ast in asts if type(ast) is Import])
+    phases['imports'] = time.perf_counter() - started
+
+    # Same order as Session.check_module, every signature first and the bodies after them
+    started = time.perf_counter()
+    checker.check_signatures([ast for ast in asts if type(ast) is not Import])
+    phases['signatures'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    checker.check_bodies()
+    phases['bodies'] = time.perf_counter() - started
+
+    # Kept so results stay comparable with reports from before the split
+    phases['check'] = phases['signatures'] + phases['bodies']
+
+    return phases
+
+def run(corpus: Corpus, repeat: int):
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = corpus.generate_project(directory)
+        working_directory = os.getcwd()
+
+        # Imports are resolved relative to the working directory
+        os.chdir(directory)
+
+        try:
+            samples = [measure(filepath) for _ in range(repeat)]
+        finally:
+            os.chdir(working_directory)
+
+    return {
+        'corpus': corpus.name,
+        'parameters': {'modules': corpus.modules, 'structs': corpus.structs, 'unions': corpus.unions, 'depth': corpus.depth, 'generics': corpus.generics, 'body': corpus.body, 'operators': corpus.operators, 'branches': corpus.branches},
+        'phases': {phase: {'min': min(sample[phase] for sample in samples), 'median': statistics.median(sample[phase] for sample in samples)} for phase in samples[0]},
+    }
+
+def compare(previous: dict, current: dict):
+    previous_results = {result['corpus']: result for result in previous['results']}
+
+    for result in current['results']:
+        if result['corpus'] not in previous_results:
+            continue
+
+        for phase, timing in result['phases'].items():
+            previous_timing = previous_results[result['corpus']]['phases'].get(phase)
+
+            if previous_timing:
+                print(f"{result['corpus']:>12} {phase:>8} {previous_timing['min'] * 1000:10.2f}ms -> {timing['min'] * 1000:10.2f}ms ({timing['min'] / previous_timing['min']:.2f}x)")
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser(description='Times lexing, parsing, import resolution and checking of synthetic gullian programs')
+    argument_parser.add_argument('corpora', nargs='*', default=list(CORPORA), help=f'corpora to run, any of: {", ".join(CORPORA)}')
+    argument_parser.add_argument('--repeat', type=int, default=5)
+    argument_parser.add_argument('--output', help='write the results as json to this file')
+    argument_parser.add_argument('--compare', help='previous json results to compare against')
+
+    arguments = argument_parser.parse_args()
+
+    report = {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.time(),
+        'results': [run(CORPORA[name], arguments.repeat) for name in arguments.corpora],
+    }
+
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(report, file, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            compare(json.load(file), report)
@@ -1,7 +1,28 @@
-from . import checker
-from . import module
+import importlib
 
+# Submodules are imported on first use, so the thin client starts with the standard library only
 __all__ = [
-    checker,
-    module
-]
\ No newline at end of file
+    'checker',
+    'module',
+    'session',
+    'resolver',
+    'symbols',
+    'interface',
+    'compatibility',
+    'incremental',
+    'pipeline',
+    'parallel',
+    'aio',
+    'binary',
+    'instrumentation',
+    'diagnostics',
+    'server',
+    'client',
+    'cli'
+]
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
\ No newline at end of file
@@ -0,0 +1,84 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import dataclasses
+import asyncio
+import os
+
+from .session import Session
+from .cli import collect
+from .diagnostics import Diagnostic
+
+def advance(steps):
+    try:
+        next(steps)
+    except StopIteration as stop:
+        return True, stop.value
+
+    return False, None
+
+@dataclass
+class AsyncSession:
+    session: Session
+    # Sessions are not thread safe, every step of every check runs in this one thread
+    executor: ThreadPoolExecutor
+    # One check at a time, the session keeps a stack of the modules being loaded
+    lock: asyncio.Lock=field(default_factory=asyncio.Lock)
+
+    async def run(self, function, *arguments):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *arguments)
+
+    async def run_steps(self, steps):
+        # The event loop gets control back between declarations, cancelling stops at the next one
+        try:
+            while True:
+                done, value = await self.run(advance, steps)
+
+                if done:
+                    return value
+        except BaseException:
+            # The step still running finishes first, the executor closes the abandoned check right after it
+            self.executor.submit(steps.close)
+            raise
+
+    async def check_file(self, filepath: str):
+        filepath = os.path.abspath(filepath)
+        name = self.session.resolver.module_name(filepath)
+
+        async with self.lock:
+            try:
+                module = await self.run_steps(self.session.load_module_steps(filepath, name))
+            except Exception as exception:
+                return [Diagnostic.from_exception(exception, name, os.path.relpath(filepath))]
+
+        return [dataclasses.replace(diagnostic, filepath=os.path.relpath(diagnostic.filepath or filepath)) for diagnostic in module.diagnostics]
+
+    async def check_paths(self, patterns: list[str]):
+        # Globbing and the import index walk the file system, so they are kept off the event loop too
+        filepaths = await asyncio.get_running_loop().run_in_executor(None, collect, patterns)
+
+        async with self.lock:
+            await self.run(self.session.resolver.refresh)
+
+        diagnostics = list()
+
+        for filepath in filepaths:
+            diagnostics.extend(await self.check_file(filepath))
+
+        return diagnostics
+
+    async def close(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    @classmethod
+    def new(cls, cache_directory: str=None, *, recover=True, jobs=1, roots: list[str]=None):
+        return cls(Session.new(cache_directory, recover=recover, jobs=jobs, roots=roots), ThreadPoolExecutor(1, thread_name_prefix='gullian-checker'))
+
+async def check(patterns: list[str], *, cache_directory: str=None, roots: list[str]=None):
+    async with AsyncSession.new(cache_directory, roots=roots) as session:
+        return await session.check_paths(patterns)
@@ -0,0 +1,658 @@
+from dataclasses import dataclass, field
+import struct
+import mmap
+import os
+
+from gullian_parser.lexer import Name
+from gullian_parser.parser import Ast, Literal, Attribute, Subscript, Call, StructLiteral, UnaryOperator, BinaryOperator, TestGuard, Body, If, Return, VariableDeclaration, UnionDeclaration, Extern
+
+from .module import Module, Type, Typed, Function, AssociatedFunction, GenericType, BASIC_TYPES, ERROR, PTR
+from .checker import CheckedCall
+
+# Layout: header, function bodies, type table, function index, string table.
+# Every integer after the header is a LEB128 varint, except the string offsets, so strings are found without decoding the others
+MAGIC = b'GULC'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIII')
+
+TYPE_BASIC, TYPE_STRUCT, TYPE_UNION, TYPE_POINTER, TYPE_INSTANCE, TYPE_ERROR, TYPE_GENERIC = range(7)
+TYPE_KINDS = ('basic', 'struct', 'union', 'pointer', 'instance', 'error', 'generic')
+
+FUNCTION_FUNCTION, FUNCTION_ASSOCIATED, FUNCTION_EXTERN, FUNCTION_INSTANCE = range(4)
+FUNCTION_KINDS = ('function', 'associated', 'extern', 'instance')
+
+NODE_NONE, NODE_BODY, NODE_TYPED, NODE_NAME, NODE_LITERAL, NODE_ATTRIBUTE, NODE_SUBSCRIPT, NODE_CALL, NODE_CHECKED_CALL, NODE_STRUCT_LITERAL, NODE_UNARY, NODE_BINARY, NODE_TEST_GUARD, NODE_VARIABLE, NODE_IF, NODE_RETURN, NODE_TYPE, NODE_MODULE = range(18)
+
+LITERAL_NONE, LITERAL_BOOL, LITERAL_INT, LITERAL_FLOAT, LITERAL_STR = range(5)
+
+NO_TYPE = 0
+
+FLOAT = struct.Struct('<d')
+OFFSET = struct.Struct('<I')
+
+def write_varint(buffer: bytearray, value: int):
+    while value >= 0x80:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+
+    buffer.append(value)
+
+def read_varint(data, offset: int):
+    result = 0
+    shift = 0
+
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7f) << shift
+
+        if byte < 0x80:
+            return result, offset
+
+        shift += 7
+
+def name_format(name):
+    return getattr(name, 'format', str(name))
+
+@dataclass
+class BinaryWriter:
+    module: Module
+    strings: dict[str, int]=field(default_factory=dict)
+    types: dict[int, int]=field(default_factory=dict)
+    type_list: list[Type]=field(default_factory=list)
+    instances: dict[int, tuple[str, tuple[Type]]]=field(default_factory=dict)
+    functions: dict[int, str]=field(default_factory=dict)
+
+    def string(self, value: str):
+        index = self.strings.get(value)
+
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+
+        return index
+
+    def type_index(self, type_: Type):
+        # Index 0 means no type, so the table starts at 1
+        if type_ is None:
+            return NO_TYPE
+
+        index = self.types.get(id(type_))
+
+        if index is None:
+            self.type_list.append(type_)
+            index = self.types[id(type_)] = len(self.type_list)
+
+        return index
+
+    def function_name(self, function: Function | AssociatedFunction):
+        # Calls are stored by qualified name, the callee may live in another module's binary
+        name = self.functions.get(id(function))
+
+        if name is None:
+            return name_format(function.head.name)
+
+        return name
+
+    def encode_type(self, buffer: bytearray, type_: Type | GenericType):
+        if type(type_) is GenericType:
+            # Only the owner of generic associated function instances, its instances are types of their own
+            buffer.append(TYPE_GENERIC)
+            write_varint(buffer, self.string(name_format(type_.name)))
+            write_varint(buffer, self.string(type_.module.name))
+            write_varint(buffer, 0)
+            return
+
+        if type_ is ERROR:
+            buffer.append(TYPE_ERROR)
+        elif any(type_ is basic_type for basic_type in BASIC_TYPES.values()):
+            buffer.append(TYPE_BASIC)
+        elif type(type_.name) is Subscript and type_.name.head is PTR:
+            buffer.append(TYPE_POINTER)
+        elif id(type_) in self.instances:
+            buffer.append(TYPE_INSTANCE)
+        elif type(type_.declaration) is UnionDeclaration:
+            buffer.append(TYPE_UNION)
+        else:
+            buffer.append(TYPE_STRUCT)
+
+        kind = buffer[-1]
+
+        write_varint(buffer, self.string(name_format(type_.name) if kind != TYPE_INSTANCE else self.instances[id(type_)][0]))
+        write_varint(buffer, self.string(type_.module_name or ''))
+
+        if kind == TYPE_POINTER:
+            write_varint(buffer, self.type_index(type_.name.items[0]))
+            return
+
+        if kind == TYPE_INSTANCE:
+            _, items = self.instances[id(type_)]
+            write_varint(buffer, len(items))
+
+            for item in items:
+                write_varint(buffer, self.type_index(item))
+
+        if kind == TYPE_BASIC or kind == TYPE_ERROR:
+            write_varint(buffer, 0)
+            return
+
+        write_varint(buffer, len(type_.fields))
+
+        for field_name, field_type in type_.fields:
+            write_varint(buffer, self.string(name_format(field_name)))
+            write_varint(buffer, self.type_index(field_type))
+
+    def encode(self, buffer: bytearray, ast: Ast):
+        # Suspended nodes wait on an explicit stack instead of the python stack, so nesting is only limited by memory
+        stack = [self.encode_node(buffer, ast)]
+
+        while stack:
+            try:
+                child = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+            else:
+                stack.append(self.encode_node(buffer, child))
+
+    def encode_node(self, buffer: bytearray, ast: Ast):
+        # Writes the node itself and yields its children in order
+        node_type = type(ast)
+
+        if ast is None:
+            buffer.append(NODE_NONE)
+        elif node_type is Typed:
+            buffer.append(NODE_TYPED)
+
+            if type(ast.type) is Module:
+                write_varint(buffer, NO_TYPE)
+            else:
+                write_varint(buffer, self.type_index(ast.type))
+
+            yield ast.ast
+        elif node_type is Type:
+            buffer.append(NODE_TYPE)
+            write_varint(buffer, self.type_index(ast))
+        elif node_type is Module:
+            buffer.append(NODE_MODULE)
+            write_varint(buffer, self.string(ast.name))
+        elif node_type is Name or node_type is str:
+            buffer.append(NODE_NAME)
+            write_varint(buffer, self.string(name_format(ast)))
+        elif node_type is Body:
+            buffer.append(NODE_BODY)
+            write_varint(buffer, len(ast.lines))
+
+            for line in ast.lines:
+                yield line
+        elif node_type is Literal:
+            buffer.append(NODE_LITERAL)
+            write_varint(buffer, getattr(ast, 'line', 0))
+
+            value = ast.value
+
+            if value is None:
+                buffer.append(LITERAL_NONE)
+            elif type(value) is bool:
+                buffer.append(LITERAL_BOOL)
+                buffer.append(int(value))
+            elif type(value) is int:
+                buffer.append(LITERAL_INT)
+                write_varint(buffer, value << 1 if value >= 0 else (-value << 1) - 1)
+            elif type(value) is float:
+                buffer.append(LITERAL_FLOAT)
+                buffer.extend(FLOAT.pack(value))
+            else:
+                buffer.append(LITERAL_STR)
+                write_varint(buffer, self.string(str(value)))
+        elif node_type is Attribute:
+            buffer.append(NODE_ATTRIBUTE)
+            yield ast.left
+            yield ast.right
+        elif node_type is Subscript:
+            buffer.append(NODE_SUBSCRIPT)
+            yield ast.head
+            write_varint(buffer, len(ast.items))
+
+            for item in ast.items:
+                yield item
+        elif node_type is CheckedCall:
+            buffer.append(NODE_CHECKED_CALL)
+            write_varint(buffer, ast.call.line)
+            write_varint(buffer, self.string(self.function_name(ast.function)))
+            write_varint(buffer, len(ast.call.arguments))
+
+            for argument in ast.call.arguments:
+                yield argument
+        elif node_type is Call:
+            buffer.append(NODE_CALL)
+            write_varint(buffer, ast.line)
+            yield ast.name
+            write_varint(buffer, len(ast.arguments))
+
+            for argument in ast.arguments:
+                yield argument
+        elif node_type is StructLiteral:
+            buffer.append(NODE_STRUCT_LITERAL)
+            write_varint(buffer, ast.line)
+            yield ast.name
+            write_varint(buffer, len(ast.arguments))
+
+            for argument in ast.arguments:
+                yield argument
+        elif node_type is UnaryOperator:
+            buffer.append(NODE_UNARY)
+            write_varint(buffer, self.string(ast.operator.kind.name))
+            yield ast.expression
+        elif node_type is BinaryOperator:
+            buffer.append(NODE_BINARY)
+            write_varint(buffer, self.string(ast.operator.kind.name))
+            yield ast.left
+            yield ast.right
+        elif node_type is TestGuard:
+            buffer.append(NODE_TEST_GUARD)
+            yield ast.expression
+        elif node_type is VariableDeclaration:
+            buffer.append(NODE_VARIABLE)
+            write_varint(buffer, ast.line)
+            write_varint(buffer, self.string(name_format(ast.name)))
+            write_varint(buffer, self.type_index(ast.hint) if type(ast.hint) is Type else NO_TYPE)
+            yield ast.value
+        elif node_type is If:
+            buffer.append(NODE_IF)
+            write_varint(buffer, ast.line)
+            yield ast.condition
+            yield ast.true_body
+            yield ast.false_body
+        elif node_type is Return:
+            buffer.append(NODE_RETURN)
+            write_varint(buffer, ast.line)
+            yield ast.value
+        else:
+            raise TypeError(f"can't encode {node_type.__name__} '{name_format(ast)}' of module {self.module.name}")
+
+    def module_functions(self, module: Module):
+        # Checked declarations of a module, generic templates are left out
+        for name, function in module.functions.items():
+            if type(function) is Function:
+                kind = FUNCTION_EXTERN if type(function.declaration) is Extern else FUNCTION_FUNCTION
+                yield kind, f'{module.name}.{name_format(name)}', function
+
+        for type_ in module.types.values():
+            for name, function in type_.functions.items():
+                if type(function) is AssociatedFunction and function.associated_type is type_:
+                    yield FUNCTION_ASSOCIATED, f'{module.name}.{name_format(type_.name)}.{name_format(name)}', function
+
+    def collect_functions(self):
+        functions = list(self.module_functions(self.module))
+
+        # Imported functions are only named, they are emitted by the binary of their module
+        for imported_module in self.module.imports.values():
+            for _, qualified_name, function in self.module_functions(imported_module):
+                self.functions[id(function)] = qualified_name
+
+        # Type instances of any module are named by their arguments, function instances are only emitted by their own module
+        for instance in self.module.instances.instances.values():
+            items = ', '.join(item.format for item in instance.items)
+
+            if type(instance.instance) is Type:
+                self.instances[id(instance.instance)] = (f'{instance.name}[{items}]', instance.items)
+            elif instance.module_name == self.module.name:
+                functions.append((FUNCTION_INSTANCE, f'{self.module.name}.{instance.name}[{items}]', instance.instance))
+            else:
+                self.functions[id(instance.instance)] = f'{instance.module_name}.{instance.name}[{items}]'
+
+        for _, qualified_name, function in functions:
+            self.functions[id(function)] = qualified_name
+
+        return functions
+
+    def dumps(self):
+        functions = self.collect_functions()
+
+        # Function bodies first, encoding them fills the type and string tables
+        bodies = bytearray()
+        entries = list()
+
+        for kind, qualified_name, function in functions:
+            offset = len(bodies)
+            body = getattr(function.declaration, 'body', None)
+
+            if body is not None:
+                self.encode(bodies, body)
+            elif kind != FUNCTION_EXTERN:
+                # Interfaces only keep signatures, writing it would silently drop the body
+                raise ValueError(f"can't write the body of '{qualified_name}', module {self.module.name} was loaded from an interface without its bodies. check it without an interface cache")
+
+            entries.append((kind, qualified_name, function, offset, len(bodies) - offset))
+
+        index = bytearray()
+        write_varint(index, len(entries))
+
+        for kind, qualified_name, function, offset, length in entries:
+            index.append(kind)
+            write_varint(index, self.string(qualified_name))
+            write_varint(index, self.type_index(function.associated_type) if type(function) is AssociatedFunction else NO_TYPE)
+            write_varint(index, len(function.head.parameters))
+
+            for parameter_name, parameter_type in function.head.parameters:
+                write_varint(index, self.string(name_format(parameter_name)))
+                write_varint(index, self.type_index(parameter_type))
+
+            write_varint(index, self.type_index(function.head.return_hint))
+            write_varint(index, offset)
+            write_varint(index, length)
+
+        # Types reference each other, encoding one may append more
+        table = bytearray()
+        encoded = 0
+
+        while encoded < len(self.type_list):
+            self.encode_type(table, self.type_list[encoded])
+            encoded += 1
+
+        types = bytearray()
+        write_varint(types, len(self.type_list))
+        types.extend(table)
+
+        self.string(self.module.name)
+
+        strings = bytearray()
+        encoded_strings = [value.encode() for value in self.strings]
+        position = 0
+
+        strings.extend(OFFSET.pack(len(encoded_strings)))
+
+        for encoded_string in encoded_strings:
+            strings.extend(OFFSET.pack(position))
+            position += len(encoded_string)
+
+        strings.extend(OFFSET.pack(position))
+
+        for encoded_string in encoded_strings:
+            strings.extend(encoded_string)
+
+        bodies_offset = HEADER.size
+        types_offset = bodies_offset + len(bodies)
+        functions_offset = types_offset + len(types)
+        strings_offset = functions_offset + len(index)
+
+        header = HEADER.pack(MAGIC, VERSION, 0, self.strings[self.module.name], bodies_offset, types_offset, functions_offset, strings_offset)
+
+        return b''.join((header, bodies, types, index, strings))
+
+def dumps(module: Module):
+    return BinaryWriter(module).dumps()
+
+def write(module: Module, filepath: str):
+    data = dumps(module)
+    temporary_filepath = f'{filepath}.{os.getpid()}.tmp'
+
+    with open(temporary_filepath, 'wb') as file:
+        file.write(data)
+
+    os.replace(temporary_filepath, filepath)
+
+class BinaryModule:
+    def __init__(self, data):
+        magic, version, _, name, self.bodies_offset, self.types_offset, self.functions_offset, self.strings_offset = HEADER.unpack_from(data, 0)
+
+        if magic != MAGIC:
+            raise ValueError('not a checked gullian module')
+
+        if version != VERSION:
+            raise ValueError(f'unsupported checked module version {version}, expected {VERSION}')
+
+        self.data = data
+        self.strings = dict()
+        self.bodies = dict()
+        self.string_count, = OFFSET.unpack_from(data, self.strings_offset)
+        self.string_data_offset = self.strings_offset + OFFSET.size * (self.string_count + 2)
+        self.name = self.string(name)
+
+        self.types = self.decode_types()
+        self.functions = self.decode_functions()
+        self.function_index = {function['name']: index for index, function in enumerate(self.functions)}
+
+    def string(self, index: int):
+        value = self.strings.get(index)
+
+        if value is None:
+            start, end = struct.unpack_from('<II', self.data, self.strings_offset + OFFSET.size * (index + 1))
+            value = self.strings[index] = bytes(self.data[self.string_data_offset + start:self.string_data_offset + end]).decode()
+
+        return value
+
+    def decode_types(self):
+        data = self.data
+        count, offset = read_varint(data, self.types_offset)
+
+        # Index 0 is no type
+        types = [None]
+
+        for _ in range(count):
+            kind = data[offset]
+            name, offset = read_varint(data, offset + 1)
+            module_name, offset = read_varint(data, offset)
+            type_ = {'kind': TYPE_KINDS[kind], 'name': self.string(name), 'module': self.string(module_name)}
+
+            if kind == TYPE_POINTER:
+                type_['pointee'], offset = read_varint(data, offset)
+                types.append(type_)
+                continue
+
+            if kind == TYPE_INSTANCE:
+                item_count, offset = read_varint(data, offset)
+                items = list()
+
+                for _ in range(item_count):
+                    item, offset = read_varint(data, offset)
+                    items.append(item)
+
+                type_['items'] = items
+
+            field_count, offset = read_varint(data, offset)
+            fields = list()
+
+            for _ in range(field_count):
+                field_name, offset = read_varint(data, offset)
+                field_type, offset = read_varint(data, offset)
+                fields.append((self.string(field_name), field_type))
+
+            type_['fields'] = fields
+            types.append(type_)
+
+        return types
+
+    def decode_functions(self):
+        data = self.data
+        count, offset = read_varint(data, self.functions_offset)
+        functions = list()
+
+        for _ in range(count):
+            kind = data[offset]
+            name, offset = read_varint(data, offset + 1)
+            associated_type, offset = read_varint(data, offset)
+            parameter_count, offset = read_varint(data, offset)
+            parameters = list()
+
+            for _ in range(parameter_count):
+                parameter_name, offset = read_varint(data, offset)
+                parameter_type, offset = read_varint(data, offset)
+                parameters.append((self.string(parameter_name), parameter_type))
+
+            return_type, offset = read_varint(data, offset)
+            body_offset, offset = read_varint(data, offset)
+            body_length, offset = read_varint(data, offset)
+
+            functions.append({'kind': FUNCTION_KINDS[kind], 'name': self.string(name), 'associated_type': associated_type, 'parameters': parameters, 'return_type': return_type, 'offset': body_offset, 'length': body_length})
+
+        return functions
+
+    def body(self, index: int):
+        # Bodies are only decoded when asked for, and each one only once
+        if index in self.bodies:
+            return self.bodies[index]
+
+        function = self.functions[index]
+        node = None
+
+        if function['length']:
+            node, _ = self.decode_node(self.bodies_offset + function['offset'])
+
+        self.bodies[index] = node
+
+        return node
+
+    def function(self, name: str):
+        index = self.function_index[name]
+
+        return dict(self.functions[index], body=self.body(index))
+
+    def decode_nodes(self, offset: int):
+        count, offset = read_varint(self.data, offset)
+        nodes = list()
+
+        for _ in range(count):
+            node, offset = yield offset
+            nodes.append(node)
+
+        return nodes, offset
+
+    def decode_node(self, offset: int):
+        # The decoders of the enclosing nodes wait on a stack too, like the encoders
+        stack = list()
+        decoder = self.decode_step(offset)
+        result = None
+
+        while True:
+            try:
+                offset = decoder.send(result)
+            except StopIteration as stop:
+                if not stack:
+                    return stop.value
+
+                decoder = stack.pop()
+                result = stop.value
+            else:
+                stack.append(decoder)
+                decoder = self.decode_step(offset)
+                result = None
+
+    def decode_step(self, offset: int):
+        # Yields the offset of each child and is sent back the decoded child and the offset after it
+        data = self.data
+        tag = data[offset]
+        offset += 1
+
+        if tag == NODE_NONE:
+            return None, offset
+        elif tag == NODE_TYPED:
+            type_, offset = read_varint(data, offset)
+            node, offset = yield offset
+
+            return {**node, 'type': type_} if type(node) is dict else {'node': 'value', 'value': node, 'type': type_}, offset
+        elif tag == NODE_TYPE:
+            type_, offset = read_varint(data, offset)
+            return {'node': 'type', 'type': type_}, offset
+        elif tag == NODE_MODULE:
+            name, offset = read_varint(data, offset)
+            return {'node': 'module', 'name': self.string(name)}, offset
+        elif tag == NODE_NAME:
+            name, offset = read_varint(data, offset)
+            return {'node': 'name', 'name': self.string(name)}, offset
+        elif tag == NODE_BODY:
+            lines, offset = yield from self.decode_nodes(offset)
+            return {'node': 'body', 'lines': lines}, offset
+        elif tag == NODE_LITERAL:
+            line, offset = read_varint(data, offset)
+            kind = data[offset]
+            offset += 1
+
+            if kind == LITERAL_NONE:
+                value = None
+            elif kind == LITERAL_BOOL:
+                value = bool(data[offset])
+                offset += 1
+            elif kind == LITERAL_INT:
+                value, offset = read_varint(data, offset)
+                value = value >> 1 if not value & 1 else -((value + 1) >> 1)
+            elif kind == LITERAL_FLOAT:
+                value, = FLOAT.unpack_from(data, offset)
+                offset += FLOAT.size
+            else:
+                value, offset = read_varint(data, offset)
+                value = self.string(value)
+
+            return {'node': 'literal', 'line': line, 'value': value}, offset
+        elif tag == NODE_ATTRIBUTE:
+            left, offset = yield offset
+            right, offset = yield offset
+            return {'node': 'attribute', 'left': left, 'right': right}, offset
+        elif tag == NODE_SUBSCRIPT:
+            head, offset = yield offset
+            items, offset = yield from self.decode_nodes(offset)
+            return {'node': 'subscript', 'head': head, 'items': items}, offset
+        elif tag == NODE_CHECKED_CALL:
+            line, offset = read_varint(data, offset)
+            function, offset = read_varint(data, offset)
+            arguments, offset = yield from self.decode_nodes(offset)
+            return {'node': 'call', 'line': line, 'function': self.string(function), 'arguments': arguments}, offset
+        elif tag == NODE_CALL:
+            line, offset = read_varint(data, offset)
+            name, offset = yield offset
+            arguments, offset = yield from self.decode_nodes(offset)
+            return {'node': 'unchecked_call', 'line': line, 'name': name, 'arguments': arguments}, offset
+        elif tag == NODE_STRUCT_LITERAL:
+            line, offset = read_varint(data, offset)
+            name, offset = yield offset
+            arguments, offset = yield from self.decode_nodes(offset)
+            return {'node': 'struct_literal', 'line': line, 'name': name, 'arguments': arguments}, offset
+        elif tag == NODE_UNARY:
+            operator, offset = read_varint(data, offset)
+            expression, offset = yield offset
+            return {'node': 'unary', 'operator': self.string(operator), 'expression': expression}, offset
+        elif tag == NODE_BINARY:
+            operator, offset = read_varint(data, offset)
+            left, offset = yield offset
+            right, offset = yield offset
+            return {'node': 'binary', 'operator': self.string(operator), 'left': left, 'right': right}, offset
+        elif tag == NODE_TEST_GUARD:
+            expression, offset = yield offset
+            return {'node': 'test_guard', 'expression': expression}, offset
+        elif tag == NODE_VARIABLE:
+            line, offset = read_varint(data, offset)
+            name, offset = read_varint(data, offset)
+            hint, offset = read_varint(data, offset)
+            value, offset = yield offset
+            return {'node': 'variable', 'line': line, 'name': self.string(name), 'hint': hint, 'value': value}, offset
+        elif tag == NODE_IF:
+            line, offset = read_varint(data, offset)
+            condition, offset = yield offset
+            true_body, offset = yield offset
+            false_body, offset = yield offset
+            return {'node': 'if', 'line': line, 'condition': condition, 'true_body': true_body, 'false_body': false_body}, offset
+        elif tag == NODE_RETURN:
+            line, offset = read_varint(data, offset)
+            value, offset = yield offset
+            return {'node': 'return', 'line': line, 'value': value}, offset
+
+        raise ValueError(f'unknown node tag {tag} at offset {offset - 1}')
+
+    @classmethod
+    def open(cls, filepath: str):
+        # Mapped, so only the pages of the decoded functions are read
+        with open(filepath, 'rb') as file:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return cls(data)
+
+    def close(self):
+        if type(self.data) is mmap.mmap:
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+        return False
@@ -1,13 +1,44 @@
+from typing import ClassVar, Callable
 from dataclasses import dataclass
-import os
+from types import GeneratorType
+import collections
+import copy
 
-from gullian_parser.source import Source
 from gullian_parser.lexer import *
 from gullian_parser.parser import *
 
 from .module import *
+from .session import Session, run_steps
+from .compatibility import are_compatible
+from .diagnostics import Diagnostic
 
-@dataclass
+# Errors that are reported as diagnostics instead of aborting, when the session recovers from errors
+RECOVERABLE_ERRORS = (NameError, TypeError, AttributeError, IndexError, KeyError, ImportError, NotImplementedError)
+
+def hint_names(type_hint: Name | Attribute | Subscript):
+    # Walked with a stack, hints nest as deep as the source does
+    names = list()
+    stack = [type_hint]
+
+    while stack:
+        type_hint = stack.pop()
+
+        if type(type_hint) is Subscript:
+            stack.extend(reversed((type_hint.head, *type_hint.items)))
+        elif type(type_hint) is Name:
+            names.append(type_hint.format)
+
+    return names
+
+# A declaration checked by Checker.check, it waits until every local type its signature names is declared
+@dataclass(slots=True)
+class StreamedDeclaration:
+    ast: Ast
+    missing: set[str]
+    result: object=None
+    checked: bool=False
+
+@dataclass(slots=True)
 class CheckedCall:
     call: Call
     function: Function | AssociatedFunction
@@ -20,42 +51,72 @@ class CheckedCall:
     def format(self):
         return self.call.format
 
+# Yielded for the operand of a test guard, the only place union fields can be accessed directly
+@dataclass(slots=True)
+class Guarded:
+    expression: Expression
+
 @dataclass
 class Checker:
     module: Module
     context: Context
+    session: Session
+    mutate: bool=True
+
+    # Dispatch tables, keyed by the exact class of the ast
+    expression_checkers: ClassVar[dict[type, Callable]] = dict()
+    statement_checkers: ClassVar[dict[type, Callable]] = dict()
+    declaration_checkers: ClassVar[dict[type, Callable]] = dict()
     
+    def update(self, ast: Ast, **changes):
+        # When not mutating, the parser output is left untouched and a shallow copy holds the checked children
+        if not self.mutate:
+            ast = copy.copy(ast)
+
+        for name, value in changes.items():
+            setattr(ast, name, value)
+
+        return ast
+
+    def report(self, exception: Exception, ast: Ast):
+        self.module.diagnostics.append(Diagnostic.from_exception(exception, self.module.name, line=getattr(ast, 'line', None)))
+
+    def import_type(self, type_hint: Name | Attribute | Subscript):
+        if not self.session.recover:
+            return self.module.import_type(type_hint)
+
+        try:
+            return self.module.import_type(type_hint)
+        except RECOVERABLE_ERRORS as exception:
+            self.report(exception, type_hint)
+            return ERROR
+
+    def is_poisoned(self, name: Name | Attribute):
+        # Anything reached through a variable of the error type was already reported
+        while type(name) is Attribute:
+            name = name.left
+
+        return type(name) is Name and self.context.scope.find_variable(name) is ERROR
+
     def check_type_compatibility(self, left: Type, right: Type, *, swap_order=True):
         if type(left) is not Type:
             raise TypeError(f"left must be a Type, got {left}. at line {left.line}, in module {self.module.name}")
         elif type(right) is not Type:
             raise TypeError(f"right must be a Type, got {left}. at line {left.line}, in module {self.module.name}")
         
-        if left is ANY:
-            return True
+        if not swap_order:
+            return are_compatible(left, right, swap_order=False)
 
-        if left == right:
-            return True
-        
-        if type(left.name) is Subscript:
-            if left.name == right.name:
-                return True
-
-        if left is PTR:
-            if right is INT:
-                return True
-            elif right is STR:
-                return True
-        
-        if swap_order:
-            return self.check_type_compatibility(right, left, swap_order=False)
-        
-        return False
+        return self.session.compatibility.is_compatible(left, right)
 
     def check_struct_literal(self, struct_literal: StructLiteral):
         type_ =  self.module.import_type(struct_literal.name)
+        arguments = list()
 
-        struct_literal.arguments = [self.check_expression(argument) for argument in struct_literal.arguments]
+        for argument in struct_literal.arguments:
+            arguments.append((yield argument))
+
+        struct_literal = self.update(struct_literal, arguments=arguments)
 
         # If its type is a union, treat it like a union literal
         if type(type_.declaration) is UnionDeclaration:
@@ -77,7 +138,6 @@ class Checker:
 
             return Typed(struct_literal, type_)
         
-        print(type_, type_.anonymous_functions, type_.declaration)
         # Treat like a normal union literal
         if len(struct_literal.arguments) > len(type_.fields):
             raise IndexError(f"too many fields to struct literal '{struct_literal.format}', expected {len(type_.fields)}, got {len(struct_literal.arguments)}. at line {struct_literal.line}, in module {self.module.name}")
@@ -91,6 +151,14 @@ class Checker:
         return Typed(struct_literal, type_)
 
     def check_call(self, call: Call):
+        if type(call.name) is Attribute and self.is_poisoned(call.name):
+            arguments = list()
+
+            for argument in call.arguments:
+                arguments.append((yield argument))
+
+            return Typed(self.update(call, arguments=arguments), ERROR)
+
         if call.generic:
             function = self.context.import_function(Subscript(call.name, tuple(self.module.import_type(hint) for hint in call.generic)))
         else:
@@ -99,16 +167,23 @@ class Checker:
             if type(function) is GenericFunction:
                 raise TypeError(f"This function is generic, you must pass its type arguments in '{call.format}'. at line {call.line}, in module {self.module.name}")
 
+        arguments = list(call.arguments)
+
         if type(function) is AssociatedFunction:
             if type(call.name) is Attribute:
-                call.arguments.insert(0, call.name.left)
+                arguments.insert(0, call.name.left)
 
-        if len(call.arguments) > len(function.declaration.head.parameters):
-            raise IndexError(f"too many arguments to function '{call.format}', expected {len(function.declaration.head.parameters)}, got {len(call.arguments)}. at line {call.line}, in module {self.module.name}")
-        elif len(call.arguments) < len(function.declaration.head.parameters):
-            raise IndexError(f"too few arguments to function '{call.format}', expected {len(function.declaration.head.parameters)}, got {len(call.arguments)}. at line {call.line}, in module {self.module.name}")
+        if len(arguments) > len(function.declaration.head.parameters):
+            raise IndexError(f"too many arguments to function '{call.format}', expected {len(function.declaration.head.parameters)}, got {len(arguments)}. at line {call.line}, in module {self.module.name}")
+        elif len(arguments) < len(function.declaration.head.parameters):
+            raise IndexError(f"too few arguments to function '{call.format}', expected {len(function.declaration.head.parameters)}, got {len(arguments)}. at line {call.line}, in module {self.module.name}")
         
-        call.arguments = [self.check_expression(argument) for argument in call.arguments]
+        checked_arguments = list()
+
+        for argument in arguments:
+            checked_arguments.append((yield argument))
+
+        call = self.update(call, arguments=checked_arguments)
 
         for argument, (parameter_name, parameter_type) in zip(call.arguments, function.head.parameters):
             if not self.check_type_compatibility(argument.type, parameter_type):
@@ -118,23 +193,50 @@ class Checker:
     
     # NOTE: May cause issues, it only works for variables
     def check_attribute(self, attribute: Attribute, *, allow_direct_union_field_acess=False):
+        if self.is_poisoned(attribute):
+            return Typed(attribute, ERROR)
+
         variable_type = self.context.import_variable(attribute.left)
-        variable_type_fields = dict(variable_type.fields)
 
-        if attribute.right not in variable_type_fields:
+        if attribute.right not in variable_type.field_index:
             raise NameError(f'{attribute.right.format} is not a field of type {variable_type.name.format}, at line {attribute.line}, in module {self.module.name}')
         
         if type(variable_type.declaration) is UnionDeclaration:
-            if not allow_direct_union_field_acess and attribute not in self.context.guards:
+            if not allow_direct_union_field_acess and not self.context.scope.is_guarded(attribute):
                 raise AttributeError(f"Acessing union field '{attribute.format}' directly is not allowed, you must check if its initialized first. at line {attribute.line}, in module {self.module.name}")
         
-        attribute.left = Typed(attribute.left, variable_type)
+        attribute = self.update(attribute, left=Typed(attribute.left, variable_type))
 
-        return Typed(attribute, variable_type_fields[attribute.right])
+        _, field_type = variable_type.field_index[attribute.right]
+
+        return Typed(attribute, field_type)
     
     def check_binary_operator(self, binary_operator: BinaryOperator):
-        binary_operator.left = self.check_expression(binary_operator.left)
-        binary_operator.right = self.check_expression(binary_operator.right)
+        # Left nested chains, like a + b + c, are folded here from the innermost operator out instead of one handler each
+        operators = [binary_operator]
+
+        while type(operators[-1].left) is BinaryOperator:
+            operators.append(operators[-1].left)
+
+        left = yield operators[-1].left
+
+        for binary_operator in reversed(operators):
+            right = yield binary_operator.right
+
+            if not self.session.recover:
+                left = self.fold_binary_operator(binary_operator, left, right)
+                continue
+
+            try:
+                left = self.fold_binary_operator(binary_operator, left, right)
+            except RECOVERABLE_ERRORS as exception:
+                self.report(exception, binary_operator)
+                left = Typed(binary_operator, ERROR)
+
+        return left
+
+    def fold_binary_operator(self, binary_operator: BinaryOperator, left: Typed, right: Typed):
+        binary_operator = self.update(binary_operator, left=left, right=right)
 
         if not self.check_type_compatibility(binary_operator.left.type, binary_operator.right.type):
             raise TypeError(f'types for {binary_operator.format} must be compatible. expected {binary_operator.left.type.format}, got {binary_operator.right.type.format}. at line {binary_operator.line}, in module {self.module.name}')
@@ -147,7 +249,7 @@ class Checker:
         raise NotImplementedError(f"bug(checker): checking for binary operator {binary_operator.format} is not implemented yet. at line {binary_operator.line}, in module {self.module.name}") 
 
     def check_unary_operator(self, unary_operator: UnaryOperator):
-        unary_operator.expression = self.check_expression(unary_operator.expression)
+        unary_operator = self.update(unary_operator, expression=(yield unary_operator.expression))
 
         if unary_operator.operator.kind is TokenKind.Ampersand:
             return Typed(unary_operator, new_ptr_for(unary_operator.expression.type))
@@ -159,110 +261,209 @@ class Checker:
         raise NotImplementedError(f"bug(checker): checking for unary operator {unary_operator.format} is not implemented yet. at line {unary_operator.line}, in module {self.module.name}")
     
     def check_test_guard(self, test_guard: TestGuard):
-        test_guard.expression = self.check_expression(test_guard.expression, allow_direct_union_field_acess=True)
+        test_guard = self.update(test_guard, expression=(yield Guarded(test_guard.expression)))
         
         return Typed(test_guard, BOOL)
     
-    def check_expression(self, expression: Expression, *, allow_direct_union_field_acess=False):
-        if type(expression) is Literal:
-            if type(expression.value) is str:
-                return Typed(expression, STR)
-            elif type(expression.value) is int:
-                return Typed(expression, INT)
-            elif type(expression.value) is float:
-                return Typed(expression, FLOAT)
-
-            raise NotImplementedError(f'checker(bug): checking for literal {expression.format} is not implemented yet. at line {expression.line}, in module {self.module.name}')
-
-        if type(expression) is Name:
-            if expression in self.context.variables:
-                return Typed(expression, self.context.variables[expression])
-            
-            raise NameError(f"{expression.format} is not a variable. at line {expression.line}, in module {self.module.name}")
-        elif type(expression) is Attribute:
-            return self.check_attribute(expression, allow_direct_union_field_acess=allow_direct_union_field_acess)
-        elif type(expression) is StructLiteral:
-            return self.check_struct_literal(expression)
-        elif type(expression) is Call:
-            return self.check_call(expression)
-        elif type(expression) is UnaryOperator:
-            return self.check_unary_operator(expression)
-        elif type(expression) is BinaryOperator:
-            return self.check_binary_operator(expression)
-        elif type(expression) is TestGuard:
-            return self.check_test_guard(expression)
+    def check_literal(self, literal: Literal):
+        if type(literal.value) is str:
+            return Typed(literal, STR)
+        elif type(literal.value) is int:
+            return Typed(literal, INT)
+        elif type(literal.value) is float:
+            return Typed(literal, FLOAT)
+
+        raise NotImplementedError(f'checker(bug): checking for literal {literal.format} is not implemented yet. at line {literal.line}, in module {self.module.name}')
+
+    def check_name(self, name: Name):
+        variable = self.context.scope.find_variable(name)
+
+        if variable is not None:
+            return Typed(name, variable)
         
-        raise NotImplementedError(f"bug(checker): checking for {expression.format} is not implemented yet. at line {expression.line}, in module {self.module.name}")
+        raise NameError(f"{name.format} is not a variable. at line {name.line}, in module {self.module.name}")
+
+    def check_unknown(self, ast: Ast, *_, **__):
+        raise NotImplementedError(f"bug(checker): checking for {ast.format} is not implemented yet. at line {ast.line}, in module {self.module.name}")
+
+    def check_expression(self, expression: Expression, *, allow_direct_union_field_acess=False):
+        # Handlers of nested expressions are generators, they yield their subexpressions and are sent back the checked ones.
+        # Suspended handlers wait on an explicit stack instead of the python stack, so nesting is only limited by memory
+        recover = self.session.recover
+        stack = list()
+
+        try:
+            while True:
+                handler = self.expression_checkers.get(type(expression), Checker.check_unknown)
+
+                if not recover:
+                    result = handler(self, expression, allow_direct_union_field_acess=allow_direct_union_field_acess)
+                else:
+                    try:
+                        result = handler(self, expression, allow_direct_union_field_acess=allow_direct_union_field_acess)
+                    except RECOVERABLE_ERRORS as exception:
+                        # Poisoned, so the enclosing expressions are still checked without reporting it again
+                        self.report(exception, expression)
+                        result = Typed(expression, ERROR)
+
+                if type(result) is GeneratorType:
+                    stack.append((expression, result))
+                    result = None
+                elif not stack:
+                    return result
+
+                # Resumes the suspended handlers until one of them yields another subexpression
+                while True:
+                    expression, handler = stack[-1]
+
+                    try:
+                        subexpression = handler.send(result)
+                        break
+                    except StopIteration as stop:
+                        stack.pop()
+                        result = stop.value
+                    except RECOVERABLE_ERRORS as exception:
+                        if not recover:
+                            raise
+
+                        stack.pop()
+                        self.report(exception, expression)
+                        result = Typed(expression, ERROR)
+
+                    if not stack:
+                        return result
+
+                if type(subexpression) is Guarded:
+                    expression, allow_direct_union_field_acess = subexpression.expression, True
+                else:
+                    expression, allow_direct_union_field_acess = subexpression, False
+        except BaseException:
+            # Unwound innermost first, so whatever the suspended handlers hold is released in order
+            for _, handler in reversed(stack):
+                handler.close()
+
+            raise
     
     def check_variable_declaration(self, variable_declaration: VariableDeclaration):
-        variable_declaration.value = self.check_expression(variable_declaration.value)
+        value = self.check_expression(variable_declaration.value)
         
         if variable_declaration.hint is None:
-            variable_declaration.hint = variable_declaration.value.type
+            hint = value.type
         else:
-            variable_declaration.hint = self.module.import_type(variable_declaration.hint)
+            hint = self.import_type(variable_declaration.hint)
         
-        self.context.variables[variable_declaration.name.format] = variable_declaration.hint
+        self.context.scope.variables[variable_declaration.name.format] = hint
 
-        return variable_declaration
+        return self.update(variable_declaration, value=value, hint=hint)
     
     def check_if(self, if_: If, expected_return_type: Type):
-        if_.condition = self.check_expression(if_.condition, allow_direct_union_field_acess=True)
+        condition = self.check_expression(if_.condition, allow_direct_union_field_acess=True)
 
-        # Add guard
-        if type(if_.condition.ast) is TestGuard:
-            self.context.guards.add(if_.condition.ast.expression)
+        # The guard only holds in the true body, it's dropped with its scope
+        scope = self.context.push_scope()
 
-        if_.true_body = self.check_body(if_.true_body, expected_return_type)
+        if type(condition.ast) is TestGuard:
+            scope.guards.add(condition.ast.expression)
 
-        # Remove guard
-        if type(if_.condition.ast) is TestGuard:
-            self.context.guards.remove(if_.condition.ast.expression)
+        try:
+            true_body = yield if_.true_body
+        finally:
+            self.context.pop_scope()
 
-        if if_.false_body:
-            if_.false_body = self.check_body(if_.false_body, expected_return_type)
+        false_body = if_.false_body
+
+        if false_body:
+            self.context.push_scope()
+
+            try:
+                false_body = yield false_body
+            finally:
+                self.context.pop_scope()
         
-        return if_
+        return self.update(if_, condition=condition, true_body=true_body, false_body=false_body)
     
     def check_return(self, return_: Return, expected_return_type: Type):
-        return_.value = self.check_expression(return_.value)
+        return_ = self.update(return_, value=self.check_expression(return_.value))
 
         if not self.check_type_compatibility(return_.value.type, expected_return_type):
             raise TypeError(f"type mismatch. return {return_.format} expects type {expected_return_type.format}, got {return_.value.type.format}. at line {return_.line}, in module {self.module.name}")
 
         return return_
 
-    def check_body(self, body: Body, expected_return_type: Type):
-        def check(ast: Ast):
-            if type(ast) is VariableDeclaration:
-                return self.check_variable_declaration(ast)
-            elif type(ast) is Call:
-                return self.check_call(ast)
-            elif type(ast) is If:
-                return self.check_if(ast, expected_return_type)
-            elif type(ast) is Return:
-                return self.check_return(ast, expected_return_type)
-            
-            raise NotImplementedError(f"bug(checker): checking for {ast.format} is not implemented yet. at line {ast.line}, in module {self.module.name}")
-
-        body.lines = [check(line) for line in body.lines]
+    def check_lines(self, body: Body):
+        lines = list()
+
+        for line in body.lines:
+            lines.append((yield line))
+
+        return self.update(body, lines=lines)
+
+    def check_statement(self, statement: Ast | Body, expected_return_type: Type):
+        # Same as expressions, ifs yield their bodies and bodies yield their lines
+        recover = self.session.recover
+        stack = list()
+
+        try:
+            while True:
+                if type(statement) is Body:
+                    result = self.check_lines(statement)
+                else:
+                    handler = self.statement_checkers.get(type(statement), Checker.check_unknown)
+
+                    if not recover:
+                        result = handler(self, statement, expected_return_type)
+                    else:
+                        try:
+                            result = handler(self, statement, expected_return_type)
+                        except RECOVERABLE_ERRORS as exception:
+                            self.report(exception, statement)
+                            result = statement
+
+                if type(result) is GeneratorType:
+                    stack.append((statement, result))
+                    result = None
+                elif not stack:
+                    return result
+
+                while True:
+                    statement, handler = stack[-1]
+
+                    try:
+                        child = handler.send(result)
+                        break
+                    except StopIteration as stop:
+                        stack.pop()
+                        result = stop.value
+                    except RECOVERABLE_ERRORS as exception:
+                        if not recover:
+                            raise
+
+                        stack.pop()
+                        self.report(exception, statement)
+                        result = statement
+
+                    if not stack:
+                        return result
+
+                statement = child
+        except BaseException:
+            # The scopes pushed by suspended ifs are popped innermost first
+            for _, handler in reversed(stack):
+                handler.close()
+
+            raise
 
-        return body
+    def check_body(self, body: Body, expected_return_type: Type):
+        return self.check_statement(body, expected_return_type)
     
     def check_import(self, import_: Import):
-        filepath = import_.module_name.format.replace('.', os.sep) + '.gullian'
+        filepath = self.session.resolver.resolve(import_.module_name.format)
 
-        if not os.path.exists(filepath):
-            raise ImportError(f"can't import '{import_.module_name.format}', file '{filepath}' does not exists.")
+        if filepath is None:
+            raise ImportError(f"can't import '{import_.module_name.format}', no module with that name in {', '.join(self.session.resolver.roots)}. at line {import_.line}, in module {self.module.name}")
         
-        module = Module.new(import_.module_name.format)
-        checker = Checker.new(module)
-
-        tokens = tuple(Lexer(Source(open(filepath).read()), module.name).lex())
-        asts = tuple(Parser(Source(tokens), module.name).parse())
-
-        for _ in checker.check(asts):
-            continue
+        # Every file is checked once per session, later importers share the same module
+        module = self.session.load_module(filepath, import_.module_name.format)
 
         self.module.imports[import_.module_name.rightest] = module
 
@@ -276,7 +477,7 @@ class Checker:
 
             return generic_union_type
         
-        union_declaration.fields = [(field_name, self.module.import_type(field_hint)) for field_name, field_hint in union_declaration.fields]
+        union_declaration = self.update(union_declaration, fields=[(field_name, self.import_type(field_hint)) for field_name, field_hint in union_declaration.fields])
         
         union_type = Type(union_declaration.name, union_declaration.fields, dict(), dict(), union_declaration, self.module.name)
         self.module.types[union_type.name] = union_type
@@ -291,7 +492,7 @@ class Checker:
 
             return generic_struct_type
         
-        struct_declaration.fields = [(field_name, self.module.import_type(field_hint)) for field_name, field_hint in struct_declaration.fields]
+        struct_declaration = self.update(struct_declaration, fields=[(field_name, self.import_type(field_hint)) for field_name, field_hint in struct_declaration.fields])
         
         struct_type = Type(struct_declaration.name, struct_declaration.fields, dict(), dict(), struct_declaration, self.module.name)
         self.module.types[struct_type.name] = struct_type
@@ -302,15 +503,27 @@ class Checker:
         if type(extern.head) is not FunctionHead:
             raise NotImplementedError(f"checker(bug): checking for '{extern.format}' is not implemented yet")
         
-        extern.head.parameters = [(parameter_name, self.module.import_type(parameter_hint)) for parameter_name, parameter_hint in extern.head.parameters]
-        extern.head.return_hint = self.module.import_type(extern.head.return_hint)
+        head = self.update(extern.head, parameters=[(parameter_name, self.import_type(parameter_hint)) for parameter_name, parameter_hint in extern.head.parameters], return_hint=self.import_type(extern.head.return_hint))
+        extern = self.update(extern, head=head)
 
         function = Function(extern)
         self.module.functions[extern.head.name] = function
 
         return extern
 
-    def check_function_declaration(self, function_declaration: FunctionDeclaration):
+    def check_function_body(self, body: Body, head: FunctionHead):
+        # Inject the parameters in a scope of their own
+        scope = self.context.push_scope()
+
+        for parameter_name, parameter_type in head.parameters:
+            scope.variables[parameter_name] = parameter_type
+
+        try:
+            return self.check_body(body, head.return_hint)
+        finally:
+            self.context.pop_scope()
+
+    def declare_function(self, function_declaration: FunctionDeclaration, *, submit=True):
         # If function is generic, ignore for now
         if function_declaration.head.generic:
             # Check and assign the associated function
@@ -318,7 +531,7 @@ class Checker:
                 associated_type = self.module.import_type(function_declaration.head.name.left)
                 associated_function = GenericFunction(function_declaration.head.generic, function_declaration, self.module)
                 
-                associated_type.functions[function_declaration.head.name.right] = associated_function
+                self.module.submit_associated_function(associated_type, function_declaration.head.name.right, associated_function)
 
                 return associated_function
             
@@ -327,60 +540,258 @@ class Checker:
 
             return generic_function
 
-        function_declaration.head.parameters = [(parameter_name, self.module.import_type(parameter_hint)) for parameter_name, parameter_hint in function_declaration.head.parameters]
-        function_declaration.head.return_hint = self.module.import_type(function_declaration.head.return_hint)
-        
-        # Check and assign the associated function
+        head = self.update(function_declaration.head, parameters=[(parameter_name, self.import_type(parameter_hint)) for parameter_name, parameter_hint in function_declaration.head.parameters], return_hint=self.import_type(function_declaration.head.return_hint))
+        function_declaration = self.update(function_declaration, head=head)
+
+        # Submitted before its body is checked, so it can be called from any body, including its own
         if type(function_declaration.head.name) is Attribute:
             associated_type = self.module.import_type(function_declaration.head.name.left)
 
-            # Inject the parameters in checker variables
-            checker = Checker(self.module, self.context.copy())
-
-            for parameter_name, parameter_type in function_declaration.head.parameters:
-                checker.context.variables[parameter_name] = parameter_type
-            
-            # Now check its body
-            function_declaration.body = checker.check_body(function_declaration.body, function_declaration.head.return_hint)
-
-            # And finnaly submit it back
             associated_function = AssociatedFunction(associated_type, function_declaration)
-            associated_type.functions[function_declaration.head.name.right] = associated_function
 
-            return associated_function
+            if submit:
+                self.module.submit_associated_function(associated_type, function_declaration.head.name.right, associated_function)
 
-        # Inject the parameters in checker variables
-        checker = Checker(self.module, self.context.copy())
+            return associated_function
 
-        for parameter_name, parameter_type in function_declaration.head.parameters:
-            checker.context.variables[parameter_name] = parameter_type
-        
-        # Now check its body
-        function_declaration.body = checker.check_body(function_declaration.body, function_declaration.head.return_hint)
-        
-        # And finnaly submit it back
         function = Function(function_declaration)
-        self.module.functions[function_declaration.head.name] = function
+
+        if submit:
+            self.module.functions[function_declaration.head.name] = function
+
+        return function
+
+    def define_function(self, function: Function | AssociatedFunction):
+        # Updated in place, everything that already references the function sees the checked body
+        function.declaration = self.update(function.declaration, body=self.check_function_body(function.declaration.body, function.head))
+
+        return function
+
+    def check_function_declaration(self, function_declaration: FunctionDeclaration):
+        function = self.declare_function(function_declaration)
+
+        if type(function) is GenericFunction:
+            return function
+
+        return self.define_function(function)
+
+    def attempt(self, ast: Ast, handler: Callable, *arguments):
+        if not self.session.recover:
+            return handler(*arguments)
+
+        try:
+            return handler(*arguments)
+        except RECOVERABLE_ERRORS as exception:
+            self.report(exception, ast)
+            return None
+
+    def check_declaration(self, declaration: Ast):
+        handler = self.declaration_checkers.get(type(declaration), Checker.check_unknown)
+
+        return self.attempt(declaration, handler, self, declaration)
+
+    def signature_names(self, declaration: Ast):
+        # Local type names a signature uses, imported ones are Attributes and are already loaded
+        if type(declaration) is StructDeclaration or type(declaration) is UnionDeclaration:
+            hints = [field_hint for _, field_hint in declaration.fields]
+            # A type naming itself can't wait for itself
+            generic = (*(declaration.generic or ()), declaration.name)
+        elif type(declaration) is FunctionDeclaration:
+            hints = [parameter_hint for _, parameter_hint in declaration.head.parameters]
+            hints.append(declaration.head.return_hint)
+            generic = declaration.head.generic
+
+            if type(declaration.head.name) is Attribute:
+                hints.append(declaration.head.name.left)
+        else:
+            return set()
+
+        parameters = {parameter.format for parameter in generic or ()}
+
+        return {name for hint in hints for name in hint_names(hint) if name not in parameters}
+
+    def check_signature(self, ast: Ast):
+        if type(ast) is not FunctionDeclaration:
+            return self.check_declaration(ast)
+
+        function = self.attempt(ast, self.declare_function, ast)
+
+        if type(function) is Function or type(function) is AssociatedFunction:
+            self.module.pending_bodies.append(function)
 
         return function
 
     def check(self, asts: Ast):
+        # Declarations are checked as soon as they are parsed, unless their signature names a type declared further down, then they wait for it.
+        # Results are handed over in source order, bodies are checked once the last signature is, so they can call anything
+        declared = set(BASIC_TYPES)
+        waiting = dict()
+        streamed = collections.deque()
+
         for ast in asts:
-            if type(ast) is Import:
-                yield self.check_import(ast)
-            elif type(ast) is StructDeclaration:
-                yield self.check_struct_declaration(ast)
-            elif type(ast) is UnionDeclaration:
-                yield self.check_union_declaration(ast)
-            elif type(ast) is Extern:
-                yield self.check_extern(ast)
-            elif type(ast) is FunctionDeclaration:
-                yield self.check_function_declaration(ast)
-            else:
-                raise NotImplementedError(f"bug(checker): checking for {ast.format} is not implemented yet. at line {ast.line}, in module {self.module.name}")
-
-        return
+            declaration = StreamedDeclaration(ast, self.signature_names(ast) - declared)
+            streamed.append(declaration)
+
+            for name in declaration.missing:
+                waiting.setdefault(name, list()).append(declaration)
+
+            ready = [declaration] if not declaration.missing else []
+
+            while ready:
+                declaration = ready.pop()
+                declaration.result = self.check_signature(declaration.ast)
+                declaration.checked = True
+
+                if type(declaration.ast) is StructDeclaration or type(declaration.ast) is UnionDeclaration:
+                    name = declaration.ast.name.format
+                    declared.add(name)
+
+                    for waiter in waiting.pop(name, ()):
+                        waiter.missing.discard(name)
+
+                        if not waiter.missing:
+                            ready.append(waiter)
+
+            while streamed and streamed[0].checked:
+                yield streamed.popleft().result
+
+        # Still waiting for types that were never declared, they are checked anyway so the missing ones are reported
+        left = [declaration for declaration in streamed if not declaration.checked]
+        types = {id(declaration.ast): declaration for declaration in left if type(declaration.ast) is StructDeclaration or type(declaration.ast) is UnionDeclaration}
+
+        for ast in self.order_types([declaration.ast for declaration in types.values()]):
+            types[id(ast)].result = self.check_signature(ast)
+
+        for declaration in left:
+            if id(declaration.ast) not in types:
+                declaration.result = self.check_signature(declaration.ast)
+
+        self.check_bodies()
+
+        for declaration in streamed:
+            yield declaration.result
+
+    def order_types(self, type_declarations: list[StructDeclaration | UnionDeclaration]):
+        # Types are declared after the types their fields use, so they can be used before being declared
+        declarations = {type_declaration.name.format: type_declaration for type_declaration in type_declarations}
+        ordered = dict()
+
+        def dependencies(type_declaration: StructDeclaration | UnionDeclaration):
+            return (name for _, field_hint in type_declaration.fields for name in hint_names(field_hint) if name in declarations)
+
+        # Depth first with an explicit stack, a chain of fields can be as long as the module
+        for type_declaration in type_declarations:
+            if type_declaration.name.format in ordered:
+                continue
+
+            # Placeholder, a cycle is left for import_type to report
+            ordered[type_declaration.name.format] = None
+            stack = [(type_declaration, dependencies(type_declaration))]
+
+            while stack:
+                type_declaration, names = stack[-1]
+
+                for name in names:
+                    if name not in ordered:
+                        ordered[name] = None
+                        stack.append((declarations[name], dependencies(declarations[name])))
+                        break
+                else:
+                    stack.pop()
+                    del ordered[type_declaration.name.format]
+                    ordered[type_declaration.name.format] = type_declaration
+
+        return list(ordered.values())
+
+    def check_signatures(self, asts: list[Ast]):
+        return run_steps(self.check_signatures_steps(asts))
+
+    def check_signatures_steps(self, asts: list[Ast]):
+        # Yields after every declaration, so callers can interleave other work between them
+        asts = list(asts)
+        imports = [ast for ast in asts if type(ast) is Import]
+        types = [ast for ast in asts if type(ast) is StructDeclaration or type(ast) is UnionDeclaration]
+        results = dict()
+
+        for ast in imports:
+            results[id(ast)] = self.check_declaration(ast)
+            yield
+
+        for ast in self.order_types(types):
+            results[id(ast)] = self.check_declaration(ast)
+            yield
+
+        for ast in asts:
+            if id(ast) not in results:
+                results[id(ast)] = self.check_signature(ast)
+                yield
+
+        return [results[id(ast)] for ast in asts]
+
+    def check_bodies(self):
+        run_steps(self.check_bodies_steps())
+
+    def check_bodies_steps(self):
+        while self.module.pending_bodies:
+            pending, self.module.pending_bodies = self.module.pending_bodies, list()
+
+            for index, function in enumerate(pending):
+                self.attempt(function.declaration, self.define_function, function)
+
+                try:
+                    yield
+                except GeneratorExit:
+                    # Abandoned, the bodies left are checked the next time the module is loaded
+                    self.module.pending_bodies[:0] = pending[index + 1:]
+                    raise
+
+    def check_module(self, asts: Ast, *, bodies=True):
+        # Every signature is known before any body is checked, bodies left pending are checked by check_bodies
+        results = self.check_signatures(list(asts))
+
+        if bodies:
+            self.check_bodies()
+
+        return results
     
     @classmethod
-    def new(cls, module: Module):
-        return cls(module, Context(module, module.imports, module.functions, module.anonymous_functions, set()))
\ No newline at end of file
+    def register_expression(cls, ast_type: type, handler: Callable):
+        cls.expression_checkers[ast_type] = handler
+
+    @classmethod
+    def register_statement(cls, ast_type: type, handler: Callable):
+        cls.statement_checkers[ast_type] = handler
+
+    @classmethod
+    def register_declaration(cls, ast_type: type, handler: Callable):
+        cls.declaration_checkers[ast_type] = handler
+
+    @classmethod
+    def new(cls, module: Module, session: Session=None, *, mutate=True):
+        if session is None:
+            session = Session.new()
+
+        return cls(module, Context(module, Scope.new(None, module.imports), module.functions, module.anonymous_functions, session), session, mutate)
+
+# Expression handlers receive the checker, the expression and the checking options
+Checker.register_expression(Literal, lambda checker, literal, **options: checker.check_literal(literal))
+Checker.register_expression(Name, lambda checker, name, **options: checker.check_name(name))
+Checker.register_expression(Attribute, lambda checker, attribute, **options: checker.check_attribute(attribute, **options))
+Checker.register_expression(StructLiteral, lambda checker, struct_literal, **options: checker.check_struct_literal(struct_literal))
+Checker.register_expression(Call, lambda checker, call, **options: checker.check_call(call))
+Checker.register_expression(UnaryOperator, lambda checker, unary_operator, **options: checker.check_unary_operator(unary_operator))
+Checker.register_expression(BinaryOperator, lambda checker, binary_operator, **options: checker.check_binary_operator(binary_operator))
+Checker.register_expression(TestGuard, lambda checker, test_guard, **options: checker.check_test_guard(test_guard))
+
+# Statement handlers receive the checker, the statement and the expected return type of the enclosing function
+Checker.register_statement(VariableDeclaration, lambda checker, variable_declaration, expected_return_type: checker.check_variable_declaration(variable_declaration))
+Checker.register_statement(Call, lambda checker, call, expected_return_type: checker.check_expression(call))
+Checker.register_statement(If, lambda checker, if_, expected_return_type: checker.check_if(if_, expected_return_type))
+Checker.register_statement(Return, lambda checker, return_, expected_return_type: checker.check_return(return_, expected_return_type))
+
+# Declaration handlers receive the checker and the top level declaration
+Checker.register_declaration(Import, lambda checker, import_: checker.check_import(import_))
+Checker.register_declaration(StructDeclaration, lambda checker, struct_declaration: checker.check_struct_declaration(struct_declaration))
+Checker.register_declaration(UnionDeclaration, lambda checker, union_declaration: checker.check_union_declaration(union_declaration))
+Checker.register_declaration(Extern, lambda checker, extern: checker.check_extern(extern))
+Checker.register_declaration(FunctionDeclaration, lambda checker, function_declaration: checker.check_function_declaration(function_declaration))
@@ -0,0 +1,137 @@
+from concurrent.futures import ProcessPoolExecutor
+import dataclasses
+import argparse
+import tempfile
+import glob
+import json
+import re
+import os
+
+from .session import Session
+from .resolver import ModuleResolver
+from .diagnostics import Diagnostic
+
+IMPORT_PATTERN = re.compile(r'^\s*import\s+([\w.]+)', re.MULTILINE)
+
+def collect(patterns: list[str]):
+    filepaths = dict()
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, '**', '*.gullian'), recursive=True)
+        elif glob.has_magic(pattern):
+            matches = glob.glob(pattern, recursive=True)
+        else:
+            matches = [pattern]
+
+        for match in sorted(matches):
+            filepaths[os.path.abspath(match)] = None
+
+    return list(filepaths)
+
+def import_graph(filepaths: list[str], resolver: ModuleResolver):
+    # Imports are top level declarations, so scanning the source is enough to know the dependencies
+    graph = dict()
+    pending = list(filepaths)
+
+    while pending:
+        filepath = pending.pop()
+
+        if filepath in graph:
+            continue
+
+        try:
+            with open(filepath) as file:
+                imported = IMPORT_PATTERN.findall(file.read())
+        except OSError:
+            imported = []
+
+        graph[filepath] = {resolver.resolve(name) for name in imported if resolver.resolve(name) is not None}
+        pending.extend(graph[filepath])
+
+    return graph
+
+def levels(graph: dict[str, set[str]]):
+    # Every level only depends on the previous ones, so the modules of a level can be checked in parallel
+    remaining = dict(graph)
+    done = set()
+    result = []
+
+    while remaining:
+        level = sorted(filepath for filepath, dependencies in remaining.items() if dependencies <= done)
+
+        # Circular imports, they will be reported by the checker
+        if not level:
+            level = sorted(remaining)
+
+        for filepath in level:
+            del remaining[filepath]
+
+        done.update(level)
+        result.append(level)
+
+    return result
+
+def check_file(session: Session, filepath: str):
+    name = session.resolver.module_name(filepath)
+
+    try:
+        module = session.load_module(filepath, name)
+    except Exception as exception:
+        return [Diagnostic.from_exception(exception, name, os.path.relpath(filepath))]
+
+    return [dataclasses.replace(diagnostic, filepath=os.path.relpath(diagnostic.filepath or filepath)) for diagnostic in module.diagnostics]
+
+SESSION: Session | None = None
+
+def initialize(cache_directory: str, body_jobs: int=1, roots: list[str]=None):
+    global SESSION
+
+    SESSION = Session.new(cache_directory, recover=True, jobs=body_jobs, roots=roots)
+
+def check(filepath: str):
+    return filepath, check_file(SESSION, filepath)
+
+def check_tree(patterns: list[str], *, jobs: int=None, cache_directory: str=None, body_jobs: int=1, roots: list[str]=None):
+    filepaths = collect(patterns)
+    diagnostics = dict()
+
+    # Indexed once here, every worker builds its own index of the same roots
+    resolver = ModuleResolver.new(roots)
+    graph = import_graph(filepaths, resolver)
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        # Workers share checked modules through the interface cache, every module is only checked once
+        cache_directory = cache_directory or temporary_directory
+
+        if jobs == 1:
+            initialize(cache_directory, body_jobs, roots)
+
+            for level in levels(graph):
+                diagnostics.update(map(check, level))
+        else:
+            with ProcessPoolExecutor(jobs, initializer=initialize, initargs=(cache_directory, body_jobs, roots)) as executor:
+                for level in levels(graph):
+                    diagnostics.update(executor.map(check, level, chunksize=max(1, len(level) // ((jobs or os.cpu_count() or 1) * 4))))
+
+    return [diagnostic for filepath in sorted(diagnostics) for diagnostic in diagnostics[filepath]]
+
+def main(arguments: list[str]=None):
+    argument_parser = argparse.ArgumentParser(prog='gullian-checker', description='Type checks gullian source trees')
+    argument_parser.add_argument('paths', nargs='+', help='files, directories or glob patterns to check')
+    argument_parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes, defaults to the number of cores')
+    argument_parser.add_argument('--body-jobs', type=int, default=1, help='number of worker processes checking the function bodies of each large module')
+    argument_parser.add_argument('-r', '--root', action='append', dest='roots', help='directory imports are resolved from, can be given several times, defaults to the working directory')
+    argument_parser.add_argument('--cache-dir', default=None, help='keep checked module interfaces in this directory between runs')
+    argument_parser.add_argument('--format', choices=('text', 'json'), default='text')
+
+    arguments = argument_parser.parse_args(arguments)
+    diagnostics = check_tree(arguments.paths, jobs=arguments.jobs, cache_directory=arguments.cache_dir, body_jobs=arguments.body_jobs, roots=arguments.roots)
+
+    if arguments.format == 'json':
+        print(json.dumps([diagnostic.to_dict() for diagnostic in diagnostics], indent=4))
+    else:
+        for diagnostic in diagnostics:
+            print(diagnostic.format)
+
+    return 1 if diagnostics else 0
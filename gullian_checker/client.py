@@ -0,0 +1,61 @@
+# Only depends on the standard library, so it can be run directly as a script
+# without importing the checker: python gullian_checker/client.py file.gullian
+import argparse
+import socket
+import json
+import sys
+import os
+
+DEFAULT_SOCKET = os.environ.get('GULLIAN_CHECKER_SOCKET', f'/tmp/gullian-checker-{os.getuid()}.sock')
+
+def request(payload: dict, socket_path: str=DEFAULT_SOCKET):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(payload).encode() + b'\n')
+
+        with connection.makefile('rb') as file:
+            return json.loads(file.readline())
+
+def main(arguments: list[str]=None):
+    argument_parser = argparse.ArgumentParser(prog='gullian-check', description='Checks gullian files through a running gullian-checkerd')
+    argument_parser.add_argument('paths', nargs='*', help='files, directories or glob patterns to check')
+    argument_parser.add_argument('--socket', default=DEFAULT_SOCKET)
+    argument_parser.add_argument('--shutdown', action='store_true', help='stop the server')
+    argument_parser.add_argument('--definition', metavar='NAME', help='print where a fully qualified name, like std.err.Result.unwrap, is declared')
+
+    arguments = argument_parser.parse_args(arguments)
+
+    if arguments.shutdown:
+        request({'command': 'shutdown'}, arguments.socket)
+        return 0
+
+    if arguments.definition is not None:
+        response = request({'command': 'definition', 'name': arguments.definition}, arguments.socket)
+        definition = response.get('definition')
+
+        if definition is None:
+            print(response.get('error', f"'{arguments.definition}' is not declared in any checked module"), file=sys.stderr)
+            return 1
+
+        print(f"{definition['filepath'] or definition['module']}:{definition['line']}: {definition['kind']} {definition['name']}")
+        return 0
+
+    # The server resolves paths from its own working directory
+    response = request({'command': 'check', 'paths': [os.path.abspath(path) for path in arguments.paths]}, arguments.socket)
+
+    if 'error' in response:
+        print(response['error'], file=sys.stderr)
+        return 2
+
+    for diagnostic in response['diagnostics']:
+        location = diagnostic['filepath'] or diagnostic['module']
+
+        if diagnostic['line'] is not None:
+            location = f"{location}:{diagnostic['line']}"
+
+        print(f"{location}: {diagnostic['severity']}: {diagnostic['message']}")
+
+    return 1 if response['diagnostics'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
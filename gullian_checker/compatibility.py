@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+
+from gullian_parser.parser import Subscript
+
+from .module import Type, ANY, PTR, INT, STR, ERROR, pointee
+
+def are_compatible(left: Type, right: Type, *, swap_order=True):
+    if left is ANY:
+        return True
+
+    # Already reported, don't report it again for every use
+    if left is ERROR:
+        return True
+
+    if left is right:
+        return True
+    
+    # Types loaded from different interfaces may not be canonical, so fallback to structural comparison
+    if type(left.name) is Subscript:
+        if left.name == right.name:
+            return True
+
+    if left is PTR:
+        if right is INT:
+            return True
+        elif right is STR:
+            return True
+    
+    if swap_order:
+        return are_compatible(right, left, swap_order=False)
+    
+    return False
+
+@dataclass
+class TypeCompatibility:
+    relation: dict[tuple[Type, Type], bool]
+    hits: int=0
+    misses: int=0
+
+    def is_compatible(self, left: Type, right: Type):
+        # Types are canonical, so the pair hashes by identity
+        key = (left, right)
+
+        if key in self.relation:
+            self.hits += 1
+            return self.relation[key]
+        
+        self.misses += 1
+        compatible = self.relation[key] = are_compatible(left, right)
+
+        return compatible
+
+    def forget(self, module_name: str, instances: set[int]=frozenset()):
+        # Pairs of a module checked again would keep its previous types alive, pointers carry the module name of their pointee.
+        # Instances over its types belong to the generic's module, they are given by the ids InstanceRegistry.forget returns
+        def stale(type_: Type):
+            return type_.module_name == module_name or id(pointee(type_)) in instances
+
+        self.relation = {key: compatible for key, compatible in self.relation.items() if not stale(key[0]) and not stale(key[1])}
+
+    @property
+    def statistics(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.relation)}
+
+    @classmethod
+    def new(cls):
+        return cls(dict())
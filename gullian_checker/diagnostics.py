@@ -0,0 +1,33 @@
+from dataclasses import dataclass
+import re
+
+LINE_PATTERN = re.compile(r'at line (\d+)')
+
+@dataclass(slots=True)
+class Diagnostic:
+    kind: str
+    message: str
+    module: str
+    filepath: str=None
+    line: int=None
+    severity: str='error'
+
+    @property
+    def format(self):
+        if self.line is None:
+            return f'{self.filepath or self.module}: {self.severity}: {self.message}'
+
+        return f'{self.filepath or self.module}:{self.line}: {self.severity}: {self.message}'
+
+    def to_dict(self):
+        return {'kind': self.kind, 'message': self.message, 'module': self.module, 'filepath': self.filepath, 'line': self.line, 'severity': self.severity}
+
+    @classmethod
+    def from_exception(cls, exception: Exception, module: str, filepath: str=None, line: int=None):
+        # The line in the message is where the error was found, the given one is where it was caught
+        match = LINE_PATTERN.search(str(exception))
+
+        if match is not None:
+            line = int(match.group(1))
+
+        return cls(type(exception).__name__, str(exception), module, filepath, line)
@@ -0,0 +1,236 @@
+from dataclasses import dataclass, is_dataclass, fields
+import hashlib
+
+from gullian_parser.lexer import Name
+from gullian_parser.parser import Ast, Import, StructDeclaration, UnionDeclaration, Extern, FunctionDeclaration, Attribute
+
+from .module import Module, Function, AssociatedFunction
+from .checker import Checker
+from .session import Session
+
+def name_format(name):
+    return getattr(name, 'format', name)
+
+def walk(ast: Ast):
+    stack = [ast]
+
+    while stack:
+        node = stack.pop()
+
+        yield node
+
+        if type(node) is Name:
+            continue
+        elif type(node) is list or type(node) is tuple:
+            stack.extend(reversed(node))
+        elif is_dataclass(node) and not isinstance(node, type):
+            stack.extend(reversed([getattr(node, field.name) for field in fields(node)]))
+
+def referenced_names(ast: Ast):
+    return frozenset(node.format for node in walk(ast) if type(node) is Name)
+
+def fingerprint(ast: Ast):
+    # Structural hash of an unchecked ast, line numbers are left out so moving a declaration does not invalidate it
+    digest = hashlib.sha256()
+    stack = [ast]
+
+    while stack:
+        node = stack.pop()
+
+        if type(node) is Name:
+            digest.update(b'N' + node.format.encode() + b'\0')
+        elif type(node) is list or type(node) is tuple:
+            digest.update(b'[%d\0' % len(node))
+            stack.extend(reversed(node))
+        elif is_dataclass(node) and not isinstance(node, type):
+            digest.update(b'D' + type(node).__name__.encode() + b'\0')
+            stack.extend(reversed([getattr(node, field.name) for field in fields(node) if field.name != 'line']))
+        else:
+            digest.update(b'V' + repr(node).encode() + b'\0')
+
+    return digest.hexdigest()
+
+@dataclass
+class Declaration:
+    key: tuple[str, str]
+    fingerprint: str
+    signature: str
+    provides: frozenset[str]
+    names: frozenset[str]
+    signature_names: frozenset[str]
+    ast: Ast
+    result: object=None
+
+    @classmethod
+    def new(cls, ast: Ast):
+        if type(ast) is Import:
+            alias = name_format(ast.module_name.rightest)
+            return cls(('import', ast.module_name.format), fingerprint(ast), fingerprint(ast), frozenset((alias, )), frozenset(), frozenset(), ast)
+        elif type(ast) is StructDeclaration or type(ast) is UnionDeclaration:
+            names = referenced_names(ast)
+            return cls(('type', ast.name.format), fingerprint(ast), fingerprint(ast), frozenset((ast.name.format, )), names, names, ast)
+        elif type(ast) is Extern or type(ast) is FunctionDeclaration:
+            name = ast.head.name
+            provides = frozenset((name.format, name.right.format)) if type(name) is Attribute else frozenset((name.format, ))
+
+            # Instances of generic functions are built from their body, so the body is part of their signature
+            if type(ast) is FunctionDeclaration and ast.head.generic:
+                signature = fingerprint(ast)
+            else:
+                signature = fingerprint(ast.head)
+
+            return cls(('function', name.format), fingerprint(ast), signature, provides, referenced_names(ast), referenced_names(ast.head), ast)
+
+        return cls(('ast', fingerprint(ast)), fingerprint(ast), fingerprint(ast), frozenset(), referenced_names(ast), frozenset(), ast)
+
+@dataclass
+class IncrementalChecker:
+    checker: Checker
+    declarations: dict[tuple[str, str], Declaration]
+
+    @property
+    def module(self):
+        return self.checker.module
+
+    @property
+    def results(self):
+        return [declaration.result for declaration in self.declarations.values()]
+
+    def forget(self, declaration: Declaration):
+        ast = declaration.ast
+
+        if type(ast) is Import:
+            self.module.imports.pop(ast.module_name.rightest, None)
+        elif type(ast) is StructDeclaration or type(ast) is UnionDeclaration:
+            self.module.types.pop(ast.name, None)
+        elif type(ast) is Extern or type(ast) is FunctionDeclaration:
+            if type(declaration.result) is AssociatedFunction:
+                declaration.result.associated_type.functions.pop(ast.head.name.right, None)
+            elif type(ast.head.name) is Attribute:
+                associated_type = self.module.types.get(ast.head.name.left)
+
+                if associated_type is not None:
+                    associated_type.functions.pop(ast.head.name.right, None)
+            else:
+                self.module.functions.pop(ast.head.name, None)
+
+    def keep_identity(self, previous: Declaration, result):
+        # Only the body changed, so the already referenced function object is updated instead of replaced
+        if type(result) is not type(previous.result):
+            return result
+
+        if type(result) is Function:
+            previous.result.declaration = result.declaration
+            self.module.functions[result.declaration.head.name] = previous.result
+        elif type(result) is AssociatedFunction:
+            previous.result.associated_type = result.associated_type
+            previous.result.declaration = result.declaration
+            self.module.submit_associated_function(result.associated_type, result.declaration.head.name.right, previous.result)
+        else:
+            return result
+
+        return previous.result
+
+    def update(self, asts: list[Ast]):
+        # The asts must be freshly parsed, fingerprints are taken before checking annotates them
+        declarations = dict()
+
+        for ast in asts:
+            declaration = Declaration.new(ast)
+
+            while declaration.key in declarations:
+                declaration.key = (*declaration.key, str(len(declarations)))
+
+            declarations[declaration.key] = declaration
+
+        previous_declarations = self.declarations
+        removed = [previous for key, previous in previous_declarations.items() if key not in declarations]
+
+        affected = set()
+        affected_names = set()
+
+        for previous in removed:
+            self.forget(previous)
+            affected_names.update(previous.provides)
+
+        # Imports are always resolved again, the session only checks them again when their file changed
+        for key, declaration in declarations.items():
+            if type(declaration.ast) is not Import:
+                continue
+
+            previous = previous_declarations.get(key)
+            previous_module = self.module.imports.get(declaration.ast.module_name.rightest)
+            declaration.result = self.checker.check_declaration(declaration.ast)
+
+            if previous is None or self.module.imports.get(declaration.ast.module_name.rightest) is not previous_module:
+                affected.add(key)
+                affected_names.update(declaration.provides)
+
+        for key, declaration in declarations.items():
+            previous = previous_declarations.get(key)
+
+            if previous is None or previous.signature != declaration.signature:
+                affected.add(key)
+                affected_names.update(declaration.provides)
+
+        # Signatures that mention an affected declaration are affected too
+        changed = True
+
+        while changed:
+            changed = False
+
+            for key, declaration in declarations.items():
+                if key not in affected and declaration.signature_names & affected_names:
+                    affected.add(key)
+                    affected_names.update(declaration.provides)
+                    changed = True
+
+        pending = list()
+
+        for key, declaration in declarations.items():
+            if type(declaration.ast) is Import:
+                continue
+
+            previous = previous_declarations.get(key)
+
+            if previous is not None and previous.result is not None and key not in affected and previous.fingerprint == declaration.fingerprint and not (declaration.names & affected_names):
+                # Unchanged, keep the already checked declaration
+                declarations[key] = previous
+                continue
+
+            pending.append(declaration)
+
+        rechecked = list()
+
+        try:
+            # Signatures first, so the changed declarations can use each other before being declared
+            results = self.checker.check_signatures([declaration.ast for declaration in pending])
+            kept = dict()
+
+            for declaration, result in zip(pending, results):
+                previous = previous_declarations.get(declaration.key)
+
+                if previous is not None and previous.result is not None and declaration.key not in affected:
+                    kept[id(result)] = result = self.keep_identity(previous, result)
+
+                declaration.result = result
+                rechecked.append((declaration.key, result))
+
+            # Bodies are checked on the functions that are kept
+            self.module.pending_bodies = [kept.get(id(function), function) for function in self.module.pending_bodies]
+            self.checker.check_bodies()
+        except Exception:
+            # Failed declarations are checked again on the next update
+            for declaration in pending:
+                declaration.result = None
+
+            self.declarations = declarations
+            raise
+
+        self.declarations = declarations
+
+        return rechecked
+
+    @classmethod
+    def new(cls, module: Module, session: Session=None):
+        return cls(Checker.new(module, session), dict())
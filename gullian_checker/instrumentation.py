@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+from time import perf_counter
+import functools
+import inspect
+import json
+
+from .module import Module, Context, GenericType, GenericFunction
+from .checker import Checker
+from .session import Session
+
+def name_format(name):
+    return getattr(name, 'format', name)
+
+# Instrumented methods, as (class, method name, span kind, span label)
+HOT_PATHS = [
+    (Session, 'check_module_steps', 'module', lambda session, filepath, name: name),
+    (Session, 'check_bodies_steps', 'module', lambda session, cached: cached.module.name),
+    (Checker, 'check_import', 'check_import', lambda checker, import_: import_.module_name.format),
+    (Checker, 'define_function', 'function', lambda checker, function: name_format(function.declaration.head.name)),
+    (Checker, 'check_type_compatibility', 'check_type_compatibility', None),
+    (Module, 'import_type', 'import_type', None),
+    (Context, 'import_function', 'import_function', None),
+    (GenericType, 'apply_generic', 'GenericType.apply_generic', lambda generic_type, items: name_format(generic_type.name)),
+    (GenericFunction, 'apply_generic', 'GenericFunction.apply_generic', lambda generic_function, items: name_format(generic_function.declaration.head.name)),
+]
+
+@dataclass
+class Measure:
+    calls: int=0
+    total: float=0.0
+    self: float=0.0
+
+class Span:
+    __slots__ = ('profiler', 'frame', 'started', 'children')
+
+    def __init__(self, profiler: "Profiler", frame: str):
+        self.profiler = profiler
+        self.frame = frame
+
+    def __enter__(self):
+        self.children = 0.0
+        self.profiler.stack.append(self)
+        self.started = perf_counter()
+
+        return self
+
+    def __exit__(self, *_):
+        elapsed = perf_counter() - self.started
+        stack = self.profiler.stack
+
+        path = tuple(span.frame for span in stack)
+        stack.pop()
+
+        if stack:
+            stack[-1].children += elapsed
+
+        measure = self.profiler.measures.get(path)
+
+        if measure is None:
+            measure = self.profiler.measures[path] = Measure()
+
+        measure.calls += 1
+        measure.total += elapsed
+        measure.self += elapsed - self.children
+
+        return False
+
+@dataclass
+class Profiler:
+    stack: list[Span]
+    measures: dict[tuple[str, ...], Measure]
+    originals: list[tuple[type, str, object]]
+
+    def span(self, kind: str, label: str=None):
+        return Span(self, kind if label is None else f'{kind}({label})')
+
+    def instrument(self, method, kind: str, label):
+        def instrumented(*arguments, **keywords):
+            with self.span(kind, None if label is None else label(*arguments)):
+                return method(*arguments, **keywords)
+
+        return functools.wraps(method)(instrumented)
+
+    def instrument_steps(self, method, kind: str, label):
+        # Step generators are measured from their first step to their last, the span stays open while they yield
+        def instrumented(*arguments, **keywords):
+            with self.span(kind, None if label is None else label(*arguments)):
+                return (yield from method(*arguments, **keywords))
+
+        return functools.wraps(method)(instrumented)
+
+    def install(self):
+        # Methods are only wrapped while profiling, so the hot paths pay nothing otherwise
+        for class_, method_name, kind, label in HOT_PATHS:
+            method = getattr(class_, method_name)
+
+            self.originals.append((class_, method_name, method))
+
+            if inspect.isgeneratorfunction(method):
+                setattr(class_, method_name, self.instrument_steps(method, kind, label))
+            else:
+                setattr(class_, method_name, self.instrument(method, kind, label))
+
+    def uninstall(self):
+        while self.originals:
+            class_, method_name, method = self.originals.pop()
+            setattr(class_, method_name, method)
+
+    def report(self):
+        kinds = dict()
+        modules = dict()
+        functions = dict()
+
+        for path, measure in self.measures.items():
+            kind = path[-1].split('(', 1)[0]
+            module = next((frame for frame in reversed(path) if frame.startswith('module(')), 'module(main)')[len('module('):-1]
+            function = next((frame for frame in reversed(path) if frame.startswith('function(')), None)
+
+            for table, key in ((kinds, kind), (modules.setdefault(module, dict()), kind)):
+                aggregated = table.setdefault(key, {'calls': 0, 'self': 0.0})
+                aggregated['calls'] += measure.calls
+                aggregated['self'] += measure.self
+
+            if function is not None:
+                aggregated = functions.setdefault(f'{module}.{function[len("function("):-1]}', dict()).setdefault(kind, {'calls': 0, 'self': 0.0})
+                aggregated['calls'] += measure.calls
+                aggregated['self'] += measure.self
+
+        return {
+            'kinds': kinds,
+            'modules': modules,
+            'functions': functions,
+            'stacks': [{'stack': list(path), 'calls': measure.calls, 'total': measure.total, 'self': measure.self} for path, measure in self.measures.items()],
+        }
+
+    def write_report(self, filepath: str):
+        with open(filepath, 'w') as file:
+            json.dump(self.report(), file, indent=4)
+
+    def write_collapsed(self, filepath: str):
+        # One line per stack with its self time in microseconds, as consumed by flamegraph.pl and speedscope
+        with open(filepath, 'w') as file:
+            for path, measure in self.measures.items():
+                file.write(f"{';'.join(path)} {round(measure.self * 1_000_000)}\n")
+
+    @classmethod
+    def new(cls):
+        return cls(list(), dict(), list())
+
+PROFILER: Profiler | None = None
+
+def enable():
+    global PROFILER
+
+    if PROFILER is None:
+        PROFILER = Profiler.new()
+        PROFILER.install()
+
+    return PROFILER
+
+def disable():
+    global PROFILER
+
+    profiler = PROFILER
+
+    if profiler is not None:
+        profiler.uninstall()
+        PROFILER = None
+
+    return profiler
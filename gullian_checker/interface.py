@@ -0,0 +1,185 @@
+from typing import TYPE_CHECKING
+from dataclasses import dataclass
+import hashlib
+import pickle
+import copy
+import io
+import os
+
+from gullian_parser.parser import Attribute
+
+from .module import Module, Type, GenericType, Function, AssociatedFunction, GenericFunction, InstanceRegistry, BASIC_TYPES, ERROR
+
+if TYPE_CHECKING:
+    from .session import Session
+
+CHECKER_VERSION = '0.0.1'
+INTERFACE_VERSION = 5
+
+class InterfacePickler(pickle.Pickler):
+    def __init__(self, file, module: Module, session: "Session"):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+
+        self.protocol = pickle.HIGHEST_PROTOCOL
+        self.module = module
+        self.module_filepaths = {id(cached.module): cached.filepath for cached in session.modules.values()}
+
+    def persistent_id(self, obj):
+        if type(obj) is Type:
+            if obj is ERROR:
+                return ('error', )
+
+            for name, basic_type in BASIC_TYPES.items():
+                if obj is basic_type:
+                    return ('basic', name)
+
+            if obj.module_name != self.module.name:
+                # Types declared by other modules are stored by reference, so identity is kept across modules
+                for imported_module in self.module.imports.values():
+                    if imported_module.name != obj.module_name:
+                        continue
+
+                    declared = imported_module.types.get(obj.name)
+
+                    if declared is obj:
+                        return ('type', self.module_filepaths[id(imported_module)], imported_module.name, obj.name)
+
+                    # Instances of generics are interned by their generic type, like err.Result[int, str]
+                    if type(declared) is GenericType:
+                        for items, instance in declared.instances.items():
+                            if instance is obj:
+                                return ('instance', self.module_filepaths[id(imported_module)], imported_module.name, obj.name, items)
+
+        elif type(obj) is GenericType and obj.module is not self.module:
+            # Instances are asked for again from the generic itself, so it must be the loading session's one
+            return ('type', self.module_filepaths[id(obj.module)], obj.module.name, obj.name)
+        elif type(obj) is GenericFunction and obj.module is not self.module:
+            name = obj.declaration.head.name
+
+            if type(name) is Attribute:
+                return ('generic-function', self.module_filepaths[id(obj.module)], obj.module.name, name.left, name.right)
+
+            return ('generic-function', self.module_filepaths[id(obj.module)], obj.module.name, None, name)
+        elif type(obj) is Module and obj is not self.module:
+            return ('module', self.module_filepaths[id(obj)], obj.name)
+        elif type(obj) is InstanceRegistry:
+            # Belongs to the session, the loading session gives its own
+            return ('instances', )
+
+        return None
+
+    def reducer_override(self, obj):
+        # Bodies left pending can't be checked from the interface, it has no bodies to check
+        if obj is self.module and obj.pending_bodies:
+            stripped = copy.copy(obj)
+            stripped.pending_bodies = list()
+
+            return stripped.__reduce_ex__(self.protocol)
+
+        # Only signatures are part of the interface, checked bodies are dropped
+        if type(obj) is Function or type(obj) is AssociatedFunction:
+            if getattr(obj.declaration, 'body', None) is not None:
+                stripped = copy.copy(obj)
+                stripped.declaration = copy.copy(obj.declaration)
+                stripped.declaration.body = None
+
+                return stripped.__reduce_ex__(self.protocol)
+
+        return NotImplemented
+
+class InterfaceUnpickler(pickle.Unpickler):
+    def __init__(self, file, session: "Session"):
+        super().__init__(file)
+
+        self.session = session
+
+    def persistent_load(self, pid):
+        kind, *arguments = pid
+
+        if kind == 'error':
+            return ERROR
+        elif kind == 'instances':
+            return self.session.instances
+        elif kind == 'basic':
+            name, = arguments
+            return BASIC_TYPES[name]
+        elif kind == 'module':
+            filepath, name = arguments
+            return self.session.load_module(filepath, name)
+        elif kind == 'type':
+            filepath, module_name, name = arguments
+            return self.session.load_module(filepath, module_name).types[name]
+        elif kind == 'generic-function':
+            filepath, module_name, type_name, name = arguments
+            module = self.session.load_module(filepath, module_name)
+
+            return module.functions[name] if type_name is None else module.types[type_name].functions[name]
+        elif kind == 'instance':
+            filepath, module_name, name, items = arguments
+            return self.session.load_module(filepath, module_name).types[name].apply_generic(items)
+
+        raise pickle.UnpicklingError(f"unknown persistent reference {pid}")
+
+@dataclass
+class InterfaceCache:
+    directory: str
+
+    def interface_filepath(self, name: str, digest: str):
+        key = hashlib.sha256(f'{CHECKER_VERSION}:{INTERFACE_VERSION}:{name}:{digest}'.encode()).hexdigest()
+
+        return os.path.join(self.directory, key + '.interface')
+
+    def load(self, name: str, digest: str, session: "Session", *, bodies=True):
+        filepath = self.interface_filepath(name, digest)
+
+        if not os.path.exists(filepath):
+            return None
+
+        try:
+            with open(filepath, 'rb') as file:
+                dependency_digests, checked_bodies, module = InterfaceUnpickler(file, session).load()
+        except (pickle.UnpicklingError, EOFError, AttributeError, KeyError, ValueError, ImportError, OSError):
+            # A stale or corrupted interface is just a cache miss
+            return None
+
+        if type(module) is not Module or module.name != name:
+            return None
+
+        # Stored after the signature pass of an imported module, its bodies may still be broken
+        if bodies and not checked_bodies:
+            return None
+
+        # The interface was built against the imported sources, it is only valid while they are the same
+        for dependency_filepath, dependency_digest in dependency_digests.items():
+            cached = session.modules.get(dependency_filepath)
+
+            if cached is None or cached.digest != dependency_digest:
+                return None
+
+        module.attach_basic_functions()
+        module.instantiate_recorded(session)
+
+        return module
+
+    def store(self, module: Module, digest: str, session: "Session"):
+        buffer = io.BytesIO()
+        imported_modules = {id(imported_module) for imported_module in module.imports.values()}
+        dependency_digests = {cached.filepath: cached.digest for cached in session.modules.values() if id(cached.module) in imported_modules}
+
+        try:
+            InterfacePickler(buffer, module, session).dump((dependency_digests, not module.pending_bodies, module))
+        except (pickle.PicklingError, KeyError, TypeError, AttributeError, RecursionError):
+            # Modules that can't be summarized, or are nested too deep to pickle, are simply checked again next time
+            return False
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        filepath = self.interface_filepath(module.name, digest)
+        temporary_filepath = f'{filepath}.{os.getpid()}.tmp'
+
+        with open(temporary_filepath, 'wb') as file:
+            file.write(buffer.getvalue())
+
+        os.replace(temporary_filepath, filepath)
+
+        return True
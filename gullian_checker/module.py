@@ -1,11 +1,19 @@
 from typing import TYPE_CHECKING
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+import dataclasses
 import copy
 
 from gullian_parser.lexer import Name
-from gullian_parser.parser import Ast, TypeDeclaration, StructDeclaration, FunctionDeclaration, Attribute, Subscript
+from gullian_parser.parser import Ast, TypeDeclaration, FunctionDeclaration, Attribute, Subscript
 
-@dataclass
+from .diagnostics import Diagnostic
+
+if TYPE_CHECKING:
+    from .session import Session
+
+# Types are canonical, there is only one object for each declared type, pointer and generic instance.
+# So they are compared and hashed by identity
+@dataclass(eq=False, slots=True)
 class Type:
     name: Name
     fields: dict[str, "Type"]
@@ -13,31 +21,53 @@ class Type:
     anonymous_functions: dict[str, "Function"]
     declaration: TypeDeclaration
     module_name: str="global"
+    pointer: "Type | None"=field(default=None, repr=False)
+    field_index: dict[Name, tuple[int, "Type"]]=field(default=None, repr=False)
+
+    def __post_init__(self):
+        if self.field_index is None:
+            self.field_index = {field_name: (offset, field_type) for offset, (field_name, field_type) in enumerate(self.fields)}
 
     def __repr__(self):
         return f'Type({self.name})'
     
-    def __hash__(self):
-        return hash((self.name, self.declaration))
-    
-    def import_field(self, name: Name | Attribute):
-        type_fields = dict(self.fields)
+    def set_fields(self, fields: list[tuple[Name, "Type"]]):
+        # Updated in place, pointers to this type share both the fields and the index
+        self.fields[:] = fields
+        self.field_index.clear()
+        self.field_index.update((field_name, (offset, field_type)) for offset, (field_name, field_type) in enumerate(fields))
 
+    def field_offset(self, name: Name):
+        if name in self.field_index:
+            offset, _ = self.field_index[name]
+            return offset
+
+        raise AttributeError(f"{name.format} is not a field of type {self.name.format}. at line {name.line}, in module {self.module_name}")
+
+    def import_field(self, name: Name | Attribute):
         if type(name) is Name:
-            if name in type_fields:
-                return type_fields[name]
+            if name in self.field_index:
+                _, field_type = self.field_index[name]
+                return field_type
             
             raise AttributeError(f"{name.format} is not a field of type {self.name.format}. at line {name.line}, in module {self.module_name}")
     
         elif type(name) is Attribute:
-            if name.left in type_fields:
-                return type_fields[name.left].import_field(name.right)
-            
+            type_ = self
+
+            # Walked with a loop, long field paths would hit the recursion limit
+            while type(name) is Attribute and name.left in type_.field_index:
+                _, type_ = type_.field_index[name.left]
+                name = name.right
+
+            if type(name) is not Attribute:
+                return type_.import_field(name)
+
+            raise AttributeError(f"{name.left.format} is not a field of type {type_.name.format}. at line {name.line}, in module {type_.module_name}")
+
         raise AttributeError(f"{name.left.format} is not a field of type {self.name.format}. at line {name.line}, in module {self.module_name}")
 
     def import_function(self, name: Name | Attribute):
-        type_fields = dict(self.fields)
-
         if type(name) is Name:
             if name in self.functions:
                 return self.functions[name]
@@ -45,8 +75,9 @@ class Type:
             raise AttributeError(f"{name.format} is not a function of type {self.name.format}. at line {name.line}, in module {self.module_name}")
     
         elif type(name) is Attribute:
-            if name.left in type_fields:
-                return type_fields[name.left].import_function(name.right)
+            if name.left in self.field_index:
+                _, field_type = self.field_index[name.left]
+                return field_type.import_function(name.right)
             
         raise AttributeError(f"{name.left.format} is not a field of type {self.name.format}. at line {name.line}, in module {self.module_name}")
     
@@ -65,7 +96,7 @@ class Type:
 
         return cls(name, dict(), dict(), dict(), declaration)
 
-@dataclass(eq=False)
+@dataclass(eq=False, slots=True)
 class Typed:
     ast: Ast
     type: Type
@@ -84,7 +115,7 @@ class Typed:
     def format(self):
         return self.ast.format
 
-@dataclass
+@dataclass(slots=True)
 class GenericType:
     name: str
     parameters: tuple[str]
@@ -92,10 +123,27 @@ class GenericType:
     functions: dict[Name, FunctionDeclaration]
     anonymous_functions: dict[Name, "Function"]
     module: "Module"
+    instances: dict[tuple[Type], Type]=field(default_factory=dict, repr=False)
 
     def apply_generic(self, items: tuple[Type]):
+        items = tuple(self.module.import_type(item) for item in items)
+
+        if items in self.instances:
+            return self.instances[items]
+
         parameters_items_dict = dict(zip(self.parameters, items))
-        declaration = copy.deepcopy(self.declaration)
+
+        # Only the fields are substituted, everything else is shared with the generic declaration
+        declaration = copy.copy(self.declaration)
+
+        # its pretty important to pass these references for the generated types,
+        # functions declared on the generic type after it's first instantiated must show up on its instances too
+        functions = self.functions
+        anonymous_functions = self.anonymous_functions
+
+        # Registered before its fields are resolved, so self referencing instances terminate
+        instance = Type(self.name, list(), functions, anonymous_functions, declaration, self.module.name)
+        self.instances[items] = instance
 
         def apply(type_hint: Name):
             if type(type_hint) is Subscript:
@@ -106,24 +154,33 @@ class GenericType:
 
             return self.module.import_type(type_hint)
         
-        declaration.fields = [(field_name, apply(field_hint)) for field_name, field_hint in declaration.fields]
+        declaration.fields = [(field_name, apply(field_hint)) for field_name, field_hint in self.declaration.fields]
+        instance.set_fields(declaration.fields)
 
-        # its pretty important to pass this reference for the generated types
-        anonymous_functions = self.anonymous_functions
+        self.module.instances.register(self.module.name, self.name.format, items, instance)
 
-        return Type(self.name, list(declaration.fields), dict(self.functions), anonymous_functions, declaration, self.module.name)
+        return instance
 
-@dataclass
+@dataclass(slots=True)
 class GenericFunction:
     parameters: tuple[Name]
     declaration: FunctionDeclaration
     module: "Module"
+    instances: dict[tuple[Type], "Function | AssociatedFunction"]=field(default_factory=dict, repr=False)
 
-    def apply_generic(self, items: tuple[Type]):
+    def apply_generic(self, items: tuple[Type], *, session: "Session"=None):
         from .checker import Checker # this is ridiculous, fix later
 
+        items = tuple(self.module.import_type(item) for item in items)
+
+        if items in self.instances:
+            return self.instances[items]
+
         parameters_items_dict = dict(zip(self.parameters, items))
-        declaration = copy.deepcopy(self.declaration)
+
+        # The declaration is a shared template, only the head is substituted
+        declaration = copy.copy(self.declaration)
+        declaration.head = copy.copy(self.declaration.head)
 
         def apply(type_hint: Name):
             if type(type_hint) is Subscript:
@@ -138,15 +195,34 @@ class GenericFunction:
         declaration.head.return_hint = apply(declaration.head.return_hint)
         declaration.head.generic = []
 
-        checker = Checker.new(self.module)
-        function = checker.check_function_declaration(declaration)
+        # The template body is shared by every instance, so it must not be annotated in place.
+        # Instances are not submitted to the module, they would replace the generic function.
+        # Checked in the caller's session, but without recovering, so their errors are raised to the caller instead of reported here
+        if session is not None and session.recover:
+            session = dataclasses.replace(session, recover=False)
+
+        checker = Checker.new(self.module, session, mutate=False)
+        function = checker.declare_function(declaration, submit=False)
 
         # This is very hacky, fix later
-        declaration.head.generic = items
+        function.declaration.head.generic = items
+
+        # Registered before its body is checked, so recursive instances terminate.
+        # Dropped again when the body fails, so every caller gets the error instead of the first one only
+        self.instances[items] = function
+
+        try:
+            checker.define_function(function)
+        except BaseException:
+            self.instances.pop(items, None)
+            raise
+
+        # Queued once checked, the instances it uses are queued before it
+        self.module.instances.register(self.module.name, self.declaration.head.name.format, items, function)
 
         return function
 
-@dataclass
+@dataclass(slots=True)
 class AssociatedFunction:
     associated_type: Type
     declaration: FunctionDeclaration
@@ -155,7 +231,7 @@ class AssociatedFunction:
     def head(self):
         return self.declaration.head
 
-@dataclass
+@dataclass(slots=True)
 class Function:
     declaration: FunctionDeclaration
 
@@ -172,6 +248,9 @@ PTR = Type.new('ptr')
 FUNCTION = Type.new('function')
 ANY = Type.new('any')
 
+# Poison type, given to anything that failed to check when recovering from errors. It can't be named in source
+ERROR = Type.new('<error>')
+
 BASIC_TYPES = {
     'void': VOID,
     'bool': BOOL,
@@ -183,32 +262,116 @@ BASIC_TYPES = {
     'any': ANY,
 }
 
+def pointee(type_: Type):
+    # ptr[ptr[T]] stands for T
+    while type(type_.name) is Subscript and type_.name.head is PTR:
+        type_ = type_.name.items[0]
+
+    return type_
+
 def new_ptr_for(type_: Type):
-    return Type(Subscript(PTR, (type_, )), type_.fields, type_.functions, type_.anonymous_functions, None, type_.module_name)
+    # Interned in the pointee, so every ptr[T] is the same object
+    if type_.pointer is None:
+        type_.pointer = Type(Subscript(PTR, (type_, )), type_.fields, type_.functions, type_.anonymous_functions, None, type_.module_name, field_index=type_.field_index)
+
+    return type_.pointer
+
+# Scopes are chained to their parent, so entering a function or a block never copies the enclosing ones.
+# The root scope holds the module imports
+@dataclass(slots=True)
+class Scope:
+    parent: "Scope | None"
+    variables: dict[str, "Type | Module"]
+    guards: set[Attribute]
+
+    def find_variable(self, name: Name):
+        scope = self
+
+        while scope is not None:
+            variable = scope.variables.get(name)
+
+            if variable is not None:
+                return variable
+
+            scope = scope.parent
+
+        return None
+
+    def is_guarded(self, attribute: Attribute):
+        scope = self
+
+        while scope is not None:
+            if attribute in scope.guards:
+                return True
+
+            scope = scope.parent
 
-@dataclass
+        return False
+
+    @classmethod
+    def new(cls, parent: "Scope | None"=None, variables: dict[str, "Type | Module"]=None):
+        return cls(parent, dict() if variables is None else variables, set())
+
+@dataclass(slots=True)
 class Context:
     module: "Module"
-    variables: dict[str, "Type | Module"]
+    scope: Scope
     functions: dict[str, FunctionDeclaration]
     anonymous_functions: dict[str, "Function"]
-    guards: set[Attribute]
+    session: "Session | None"=None
+
+    def push_scope(self):
+        self.scope = Scope.new(self.scope)
 
-    def copy(self):
-        return type(self)(self.module, dict(self.variables), dict(self.functions), dict(self.anonymous_functions), set())
+        return self.scope
+
+    def pop_scope(self):
+        self.scope = self.scope.parent
     
+    def import_qualified_function(self, name: Attribute):
+        # Paths through an imported module, like err.Result.unwrap, are a single lookup in the session symbols
+        members = list()
+
+        while type(name) is Attribute:
+            members.append(name.right.format)
+            name = name.left
+
+        module = self.scope.find_variable(name)
+
+        if type(module) is not Module:
+            return None
+
+        members.reverse()
+        function = self.session.symbols.resolve(module, '.'.join(members))
+
+        if type(function) is Type or type(function) is GenericType:
+            return None
+
+        return function
+
     def import_variable(self, name: Name | Attribute):
         if type(name) is Name:
-            if name in self.variables:
-                return self.variables[name]
+            variable = self.scope.find_variable(name)
+
+            if variable is not None:
+                return variable
             
             raise AttributeError(f"{name.format} is not a variable of the current scope. at line {name.line}, in module {self.module.name}")
         elif type(name) is Attribute:
-            if type(name.left) is Attribute:
-                return self.import_variable(name.left).import_field(name.right)
+            # a.b.c is Attribute(Attribute(a, b), c), the chain is unrolled from its root instead of recursing
+            fields = [name.right]
+
+            while type(name.left) is Attribute:
+                name = name.left
+                fields.append(name.right)
 
-            if name.left in self.variables:
-                return self.variables[name.left].import_field(name.right)
+            variable = self.scope.find_variable(name.left)
+
+            if variable is not None:
+                for field_name in reversed(fields):
+                    variable = variable.import_field(field_name)
+
+                return variable
             
         raise AttributeError(f"{name.left.format} is not a variable of the current scope. at line {name.line}, in module {self.module.name}")
 
@@ -219,18 +382,27 @@ class Context:
             
             raise AttributeError(f"{name.format} is not a function of the current scope. at line {name.line}, in module {self.module.name}")
         elif type(name) is Attribute:
+            if self.session is not None:
+                function = self.import_qualified_function(name)
+
+                if function is not None:
+                    return function
+
             if type(name.left) is Attribute:
                 return self.import_variable(name.left).import_function(name.right)
 
-            if name.left in self.variables:
-                return self.variables[name.left].import_function(name.right)
+            variable = self.scope.find_variable(name.left)
+
+            if variable is not None:
+                return variable.import_function(name.right)
             
             raise AttributeError(f"{name.left.format} is not an variable of the current scope. at line {name.line}, in module {self.module.name}")
         elif type(name) is Subscript:
             base_function = self.import_function(name.head)
 
             if type(base_function) is GenericFunction:
-                anonymous_function = base_function.apply_generic(name.items)
+                anonymous_function = base_function.apply_generic(name.items, session=self.session)
+                self.module.record_instantiation(base_function, anonymous_function.head.generic)
 
                 if type(anonymous_function) is AssociatedFunction:
                     anonymous_function.associated_type.anonymous_functions[Subscript(anonymous_function.head.name, name.items)] = anonymous_function
@@ -241,9 +413,78 @@ class Context:
             
             raise TypeError(f"function '{base_function.head.format}' is not a generic function. at line {name.line}, in module {self.module.name}")
 
-        return self.module.import_function(name)
+        return self.module.import_function(name, session=self.session)
 
-@dataclass
+@dataclass(slots=True)
+class Instance:
+    module_name: str
+    name: str
+    items: tuple[Type]
+    instance: "Type | Function | AssociatedFunction"
+
+# Every generic instance of the program, whichever module it was used from.
+# Modules of a session share one registry, so the backend consumes each instance once
+@dataclass(slots=True)
+class InstanceRegistry:
+    instances: dict[tuple[str, str, tuple[Type]], Instance]
+    worklist: list[Instance]
+
+    def register(self, module_name: str, name: str, items: tuple[Type], instance: "Type | Function | AssociatedFunction"):
+        key = (module_name, name, items)
+
+        if key in self.instances:
+            return self.instances[key]
+
+        registered = self.instances[key] = Instance(module_name, name, items, instance)
+        self.worklist.append(registered)
+
+        return registered
+
+    def register_module(self, module: "Module"):
+        # Instances that came with a module interface instead of being instantiated in this session
+        for type_ in module.types.values():
+            if type(type_) is GenericType:
+                for items, instance in type_.instances.items():
+                    self.register(module.name, type_.name.format, items, instance)
+
+            for function in type_.functions.values():
+                if type(function) is GenericFunction:
+                    for items, instance in function.instances.items():
+                        self.register(module.name, function.declaration.head.name.format, items, instance)
+
+        for function in module.functions.values():
+            if type(function) is GenericFunction:
+                for items, instance in function.instances.items():
+                    self.register(module.name, function.declaration.head.name.format, items, instance)
+
+    def forget(self, module_name: str):
+        # The module is checked again, its generics and so their instances are new objects.
+        # So are its types, instances of other generics over them, like err.Result[main.Foo, str], go too.
+        # Arguments are registered before the instances that use them, so one pass finds nested ones
+        forgotten = set()
+        instances = dict()
+
+        for key, instance in self.instances.items():
+            if instance.module_name == module_name or any(item.module_name == module_name or id(pointee(item)) in forgotten for item in instance.items):
+                forgotten.add(id(instance.instance))
+            else:
+                instances[key] = instance
+
+        self.instances = instances
+        self.worklist = [instance for instance in self.worklist if id(instance.instance) not in forgotten]
+
+        return forgotten
+
+    def take(self):
+        worklist, self.worklist = self.worklist, list()
+
+        return worklist
+
+    @classmethod
+    def new(cls):
+        return cls(dict(), list())
+
+@dataclass(slots=True)
 class Module:
     name: str
     types: dict[str, Type | GenericType]
@@ -251,10 +492,48 @@ class Module:
     functions: dict[str, Function | GenericFunction]
     anonymous_functions: dict[str, Function]
     imports: dict[str, "Module"]
+    diagnostics: list[Diagnostic]=field(default_factory=list)
+    pending_bodies: list[Function | AssociatedFunction]=field(default_factory=list)
+    instances: InstanceRegistry=field(default_factory=InstanceRegistry.new)
+    # Basic types are shared by every module, so the functions a module declares on them are kept here too, by (type name, function name)
+    basic_functions: dict[tuple[str, Name], "AssociatedFunction | GenericFunction"]=field(default_factory=dict)
+    # Generics of other modules this module instantiated. Its interface has no bodies, so they are instantiated again when it's loaded from one
+    instantiations: list[tuple["GenericType | GenericFunction", tuple[Type]]]=field(default_factory=list)
+
+    def submit_associated_function(self, associated_type: Type, name: Name, function: "AssociatedFunction | GenericFunction"):
+        associated_type.functions[name] = function
+
+        if BASIC_TYPES.get(associated_type.name) is associated_type:
+            self.basic_functions[(associated_type.name.format, name)] = function
+
+    def record_instantiation(self, generic: "GenericType | GenericFunction", items: tuple[Type]):
+        if generic.module is self:
+            return
+
+        for recorded, recorded_items in self.instantiations:
+            if recorded is generic and recorded_items == items:
+                return
+
+        self.instantiations.append((generic, items))
+
+    def instantiate_recorded(self, session: "Session"):
+        for generic, items in self.instantiations:
+            if type(generic) is GenericFunction:
+                generic.apply_generic(items, session=session)
+            else:
+                generic.apply_generic(items)
+
+    def attach_basic_functions(self):
+        # Loaded from an interface, the basic types of this process don't have them yet
+        for (type_name, name), function in self.basic_functions.items():
+            BASIC_TYPES[type_name].functions[name] = function
 
     @classmethod
-    def new(cls, name: str='main'):
-        return cls(name, dict(), dict(), dict(), dict(), dict())
+    def new(cls, name: str='main', instances: InstanceRegistry=None):
+        if instances is None:
+            return cls(name, dict(), dict(), dict(), dict(), dict())
+
+        return cls(name, dict(), dict(), dict(), dict(), dict(), instances=instances)
 
     def import_type(self, name: Name | Attribute | Type):
         if type(name) is Type:
@@ -279,6 +558,7 @@ class Module:
             if type(base_type) is GenericType:
                 items = tuple(self.import_type(item) for item in name.items)
                 anonymous_type = base_type.apply_generic(items)
+                self.record_instantiation(base_type, items)
 
                 self.anonymous_types[Subscript(base_type.name, items)] = anonymous_type
 
@@ -294,7 +574,7 @@ class Module:
 
         raise TypeError(f'{name} must be either Name, or Attribute. got {name}. at line {name.line}, in module {self.name}')
     
-    def import_function(self, name: Name | Attribute):
+    def import_function(self, name: Name | Attribute, *, session: "Session"=None):
         if type(name) is Name:
             return self.functions[name]
         elif type(name) is Attribute:
@@ -305,10 +585,13 @@ class Module:
             
             raise NameError(f'{name.left.format} is not an import of module {self.name}. at line {name.line}')
         elif type(name) is Subscript:
-            base_function = self.import_function(name.head)
+            base_function = self.import_function(name.head, session=session)
 
             if type(base_function) is GenericFunction:
-                return base_function.apply_generic(name.items)
+                function = base_function.apply_generic(name.items, session=session)
+                self.record_instantiation(base_function, function.head.generic)
+
+                return function
             
             raise TypeError(f"function '{base_function.head.format}' is not a generic function. at line {name.line}, in module {self.name}")
         
@@ -0,0 +1,285 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import pickle
+import io
+
+from gullian_parser.source import Source
+from gullian_parser.lexer import Lexer
+from gullian_parser.parser import Parser, Attribute, Subscript
+
+from .module import Module, Type, GenericType, Function, AssociatedFunction, GenericFunction, BASIC_TYPES, ERROR, PTR, new_ptr_for
+from .session import Session
+from .checker import Checker
+
+# Below this many pending bodies, starting the workers costs more than it saves
+THRESHOLD = 64
+
+REFERENCED_TYPES = (Type, GenericType, Function, AssociatedFunction, GenericFunction)
+
+def session_modules(module: Module, session: Session):
+    return [module, *(cached.module for cached in session.modules.values() if cached.module is not module)]
+
+def generic_functions(modules: list[Module]):
+    found = dict()
+
+    for module in modules:
+        for function in module.functions.values():
+            if type(function) is GenericFunction:
+                found[id(function)] = function
+
+        for type_ in module.types.values():
+            for function in type_.functions.values():
+                if type(function) is GenericFunction:
+                    found[id(function)] = function
+
+    return list(found.values())
+
+class BodyPickler(pickle.Pickler):
+    def __init__(self, file, module: Module, session: Session):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+
+        modules = session_modules(module, session)
+
+        # Checked bodies only point at declarations both processes have, so everything is sent by reference
+        self.module_ids = {id(cached.module): ('module', cached.filepath) for cached in session.modules.values()}
+        self.module_ids[id(module)] = ('self', )
+        self.references = dict()
+
+        for referenced_module in modules:
+            for name, function in referenced_module.functions.items():
+                self.references[id(function)] = ('function', referenced_module, name)
+
+            for name, type_ in referenced_module.types.items():
+                self.references[id(type_)] = ('type', referenced_module, name)
+
+                for function_name, function in type_.functions.items():
+                    self.references.setdefault(id(function), ('associated', type_, function_name))
+
+                if type(type_) is GenericType:
+                    for items, instance in type_.instances.items():
+                        self.references[id(instance)] = ('type-instance', type_, items)
+
+        for generic_function in generic_functions(modules):
+            for items, instance in generic_function.instances.items():
+                self.references[id(instance)] = ('function-instance', generic_function, items)
+
+    def persistent_id(self, obj):
+        if type(obj) is Module:
+            if id(obj) not in self.module_ids:
+                raise pickle.PicklingError(f"module '{obj.name}' is not part of the session")
+
+            return self.module_ids[id(obj)]
+
+        if type(obj) is Type:
+            if obj is ERROR:
+                return ('error', )
+
+            for name, basic_type in BASIC_TYPES.items():
+                if obj is basic_type:
+                    return ('basic', name)
+
+            if type(obj.name) is Subscript and obj.name.head is PTR:
+                return ('pointer', obj.name.items[0])
+
+        if type(obj) in REFERENCED_TYPES:
+            if id(obj) not in self.references:
+                raise pickle.PicklingError(f"{type(obj).__name__} can't be referenced from another process")
+
+            return self.references[id(obj)]
+
+        return None
+
+class BodyUnpickler(pickle.Unpickler):
+    def __init__(self, file, module: Module, session: Session):
+        super().__init__(file)
+
+        self.module = module
+        self.session = session
+        self.placeholders = list()
+
+    def persistent_load(self, pid):
+        kind, *arguments = pid
+
+        if kind == 'self':
+            return self.module
+        elif kind == 'module':
+            filepath, = arguments
+            return self.session.modules[filepath].module
+        elif kind == 'error':
+            return ERROR
+        elif kind == 'basic':
+            name, = arguments
+            return BASIC_TYPES[name]
+        elif kind == 'pointer':
+            pointee, = arguments
+            return new_ptr_for(pointee)
+        elif kind == 'type':
+            module, name = arguments
+            return module.types[name]
+        elif kind == 'type-instance':
+            generic_type, items = arguments
+            return generic_type.apply_generic(items)
+        elif kind == 'function':
+            module, name = arguments
+            return module.functions[name]
+        elif kind == 'associated':
+            type_, name = arguments
+            return type_.functions[name]
+        elif kind == 'function-instance':
+            generic_function, items = arguments
+
+            if items in generic_function.instances:
+                return generic_function.instances[items]
+
+            # Filled in by merge, the worker sends every instance it created along with the bodies
+            if type(generic_function.declaration.head.name) is Attribute:
+                placeholder = AssociatedFunction(None, None)
+            else:
+                placeholder = Function(None)
+
+            generic_function.instances[items] = placeholder
+            self.placeholders.append((generic_function, items, placeholder))
+
+            return placeholder
+
+        raise pickle.UnpicklingError(f"unknown persistent reference {pid}")
+
+@dataclass
+class Worker:
+    session: Session
+    module: Module
+    pending: list[Function | AssociatedFunction]
+    instances: dict[int, set[tuple[Type]]]
+
+WORKER: Worker | None = None
+
+def initialize(filepath: str, name: str, data: bytes, cache_directory: str, recover: bool, roots: list[str]):
+    global WORKER
+
+    # Every worker collects the same signatures, so pending bodies are found by their index
+    session = Session.new(cache_directory, recover=recover, roots=roots)
+    module = Module.new(name, session.instances)
+
+    tokens = tuple(Lexer(Source(data.decode()), module.name).lex())
+
+    session.loading.append((filepath, dict()))
+
+    try:
+        Checker.new(module, session).check_module(Parser(Source(tokens), module.name).parse(), bodies=False)
+    finally:
+        session.loading.pop()
+
+    instances = {id(generic_function): set(generic_function.instances) for generic_function in generic_functions(session_modules(module, session))}
+    WORKER = Worker(session, module, module.pending_bodies, instances)
+    module.pending_bodies = list()
+
+def check(start: int, end: int):
+    worker = WORKER
+    checker = Checker.new(worker.module, worker.session)
+    diagnostics_start = len(worker.module.diagnostics)
+
+    for function in worker.pending[start:end]:
+        checker.attempt(function.declaration, checker.define_function, function)
+
+    # Instances created by earlier chunks are sent again, chunks may be merged in any worker order
+    instances = list()
+
+    for generic_function in generic_functions(session_modules(worker.module, worker.session)):
+        known = worker.instances.get(id(generic_function), ())
+
+        for items, instance in generic_function.instances.items():
+            if items not in known:
+                instances.append((generic_function, items, instance.declaration, getattr(instance, 'associated_type', None)))
+
+    bodies = [function.declaration.body for function in worker.pending[start:end]]
+    buffer = io.BytesIO()
+
+    try:
+        BodyPickler(buffer, worker.module, worker.session).dump((bodies, instances, worker.module.instantiations, worker.module.diagnostics[diagnostics_start:]))
+    except (pickle.PicklingError, KeyError, TypeError, AttributeError, RecursionError):
+        # The chunk is checked again by the parent, pickle still recurses into deeply nested bodies
+        return None
+
+    return buffer.getvalue()
+
+def merge(checker: Checker, pending: list[Function | AssociatedFunction], start: int, payload: bytes):
+    unpickler = BodyUnpickler(io.BytesIO(payload), checker.module, checker.session)
+
+    try:
+        bodies, instances, instantiations, diagnostics = unpickler.load()
+
+        filled = {id(placeholder) for _, _, placeholder in unpickler.placeholders}
+
+        for generic_function, items, declaration, associated_type in instances:
+            instance = generic_function.instances.get(items)
+
+            if instance is None:
+                instance = AssociatedFunction(associated_type, declaration) if associated_type is not None else Function(declaration)
+                generic_function.instances[items] = instance
+            elif id(instance) in filled:
+                instance.declaration = declaration
+
+                if type(instance) is AssociatedFunction:
+                    instance.associated_type = associated_type
+            else:
+                # Already instantiated here, or by a chunk merged before
+                continue
+
+            filled.discard(id(instance))
+
+            if type(instance) is AssociatedFunction:
+                instance.associated_type.anonymous_functions[Subscript(instance.head.name, items)] = instance
+            else:
+                checker.module.anonymous_functions[Subscript(instance.head.name, items)] = instance
+
+            generic_function.module.instances.register(generic_function.module.name, generic_function.declaration.head.name.format, items, instance)
+
+        if filled:
+            raise pickle.UnpicklingError('instances are missing from the chunk')
+    except (pickle.UnpicklingError, KeyError, TypeError, AttributeError, EOFError):
+        for generic_function, items, placeholder in unpickler.placeholders:
+            if generic_function.instances.get(items) is placeholder:
+                del generic_function.instances[items]
+
+        return False
+
+    for function, body in zip(pending[start:start + len(bodies)], bodies):
+        function.declaration = checker.update(function.declaration, body=body)
+
+    for generic, items in instantiations:
+        checker.module.record_instantiation(generic, items)
+
+    # Instances checked by several workers report the same errors
+    known = {(diagnostic.kind, diagnostic.message, diagnostic.line) for diagnostic in checker.module.diagnostics}
+
+    for diagnostic in diagnostics:
+        if (diagnostic.kind, diagnostic.message, diagnostic.line) not in known:
+            known.add((diagnostic.kind, diagnostic.message, diagnostic.line))
+            checker.module.diagnostics.append(diagnostic)
+
+    return True
+
+def check_bodies(session: Session, filepath: str, module: Module, data: bytes, jobs: int):
+    pending, module.pending_bodies = module.pending_bodies, list()
+    checker = Checker.new(module, session)
+
+    size = max(1, len(pending) // (jobs * 4))
+    chunks = [(start, min(start + size, len(pending))) for start in range(0, len(pending), size)]
+    cache_directory = None if session.interfaces is None else session.interfaces.directory
+
+    with ProcessPoolExecutor(jobs, initializer=initialize, initargs=(filepath, module.name, data, cache_directory, session.recover, session.resolver.roots)) as executor:
+        futures = [executor.submit(check, start, end) for start, end in chunks]
+
+        try:
+            # Merged in source order whatever order they finish in, so the result does not depend on scheduling
+            for (start, end), future in zip(chunks, futures):
+                payload = future.result()
+
+                if payload is None or not merge(checker, pending, start, payload):
+                    for function in pending[start:end]:
+                        checker.attempt(function.declaration, checker.define_function, function)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+
+            raise
@@ -0,0 +1,30 @@
+import os
+
+from gullian_parser.source import Source
+from gullian_parser.lexer import Lexer
+from gullian_parser.parser import Parser
+
+from .module import Module
+from .session import Session
+from .checker import Checker
+
+def parse(text: str, module_name: str):
+    # The parser needs the whole token sequence, but declarations are handed over as soon as they are parsed
+    tokens = tuple(Lexer(Source(text), module_name).lex())
+
+    return Parser(Source(tokens), module_name).parse()
+
+def check_source(text: str, module: Module, session: Session=None):
+    checker = Checker.new(module, session)
+
+    # Checker.check consumes one declaration at a time, only those waiting for a type declared further down and the function bodies are held back
+    yield from checker.check(parse(text, module.name))
+
+def check_file(filepath: str, module_name: str=None, session: Session=None):
+    if module_name is None:
+        module_name = os.path.splitext(os.path.basename(filepath))[0]
+
+    with open(filepath) as file:
+        text = file.read()
+
+    yield from check_source(text, Module.new(module_name, None if session is None else session.instances), session)
@@ -0,0 +1,83 @@
+from dataclasses import dataclass, field
+import os
+
+EXTENSION = '.gullian'
+
+@dataclass
+class ModuleResolver:
+    roots: list[str]
+    index: dict[str, str] | None=None
+    directories: dict[str, int]=field(default_factory=dict)
+
+    def build(self):
+        # Earlier roots shadow later ones, so a project can override the standard library or its vendored modules
+        index = dict()
+        directories = dict()
+
+        for root in self.roots:
+            for directory, subdirectories, filenames in os.walk(root):
+                # Hidden directories hold caches and version control, never modules
+                subdirectories[:] = sorted(subdirectory for subdirectory in subdirectories if not subdirectory.startswith('.'))
+
+                try:
+                    directories[directory] = os.stat(directory).st_mtime_ns
+                except OSError:
+                    continue
+
+                for filename in sorted(filenames):
+                    if not filename.endswith(EXTENSION):
+                        continue
+
+                    filepath = os.path.join(directory, filename)
+                    index.setdefault(os.path.relpath(filepath, root)[:-len(EXTENSION)].replace(os.sep, '.'), filepath)
+
+        self.index = index
+        self.directories = directories
+
+        return index
+
+    def is_stale(self):
+        # Adding, removing or renaming a file changes the mtime of its directory, so files themselves are never stat'ed
+        if self.index is None:
+            return True
+
+        for directory, mtime in self.directories.items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+
+        return False
+
+    def invalidate(self):
+        self.index = None
+
+    def refresh(self):
+        if self.is_stale():
+            self.build()
+
+    def resolve(self, name: str):
+        index = self.index
+
+        if index is None:
+            index = self.build()
+
+        return index.get(name)
+
+    def module_name(self, filepath: str):
+        filepath = os.path.abspath(filepath)
+
+        for root in self.roots:
+            if os.path.commonpath((root, filepath)) == root:
+                return os.path.splitext(os.path.relpath(filepath, root))[0].replace(os.sep, '.')
+
+        return os.path.splitext(os.path.basename(filepath))[0]
+
+    @classmethod
+    def new(cls, roots: list[str]=None):
+        # Without explicit roots, modules are resolved from the working directory at the time the resolver is created
+        if not roots:
+            roots = [os.getcwd()]
+
+        return cls([os.path.abspath(root) for root in roots])
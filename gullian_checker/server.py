@@ -0,0 +1,84 @@
+import socketserver
+import threading
+import argparse
+import json
+import os
+
+from .session import Session
+from .cli import collect, check_file
+from .client import DEFAULT_SOCKET
+
+class CheckerRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # One json request per line, answered by one json response per line
+        for line in self.rfile:
+            try:
+                response = self.server.dispatch(json.loads(line))
+            except Exception as exception:
+                response = {'error': f'{type(exception).__name__}: {exception}'}
+
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+class CheckerServer(socketserver.UnixStreamServer):
+    def __init__(self, socket_path: str, session: Session):
+        super().__init__(socket_path, CheckerRequestHandler)
+
+        self.session = session
+
+    def dispatch(self, request: dict):
+        command = request.get('command')
+
+        if command == 'check':
+            # Modules are kept checked in the session, only files changed on disk are checked again.
+            # The import index is only rebuilt when files were added, removed or renamed
+            self.session.resolver.refresh()
+            diagnostics = [diagnostic.to_dict() for filepath in collect(request['paths']) for diagnostic in check_file(self.session, filepath)]
+
+            return {'diagnostics': diagnostics}
+        elif command == 'definition':
+            symbol = self.session.symbols.find(request['name'])
+
+            if symbol is None:
+                return {'definition': None}
+
+            return {'definition': {'name': symbol.name, 'kind': symbol.kind, 'module': symbol.module_name, 'filepath': symbol.filepath, 'line': symbol.line}}
+        elif command == 'ping':
+            return {'modules': len(self.session.modules)}
+        elif command == 'stats':
+            return {'modules': sorted(cached.module.name for cached in self.session.modules.values()), 'compatibility': self.session.compatibility.statistics}
+        elif command == 'shutdown':
+            threading.Thread(target=self.shutdown).start()
+            return {'shutdown': True}
+
+        raise ValueError(f"unknown command '{command}'")
+
+def serve(socket_path: str, *, preload: list[str]=(), cache_directory: str=None, roots: list[str]=None):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    session = Session.new(cache_directory, recover=True, roots=roots)
+
+    # Warm up, usually the standard library
+    for filepath in collect(preload):
+        check_file(session, filepath)
+
+    with CheckerServer(socket_path, session) as server:
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+def main(arguments: list[str]=None):
+    argument_parser = argparse.ArgumentParser(prog='gullian-checkerd', description='Keeps checked gullian modules in memory and serves check requests over a unix socket')
+    argument_parser.add_argument('--socket', default=DEFAULT_SOCKET)
+    argument_parser.add_argument('--preload', nargs='*', default=['std'], help='files, directories or glob patterns to check on startup')
+    argument_parser.add_argument('-r', '--root', action='append', dest='roots', help='directory imports are resolved from, can be given several times, defaults to the working directory')
+    argument_parser.add_argument('--cache-dir', default=None, help='load and store checked module interfaces in this directory')
+
+    arguments = argument_parser.parse_args(arguments)
+
+    serve(arguments.socket, preload=arguments.preload, cache_directory=arguments.cache_dir, roots=arguments.roots)
+
+if __name__ == '__main__':
+    main()
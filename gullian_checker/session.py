@@ -0,0 +1,189 @@
+from dataclasses import dataclass, field
+import hashlib
+import os
+
+from gullian_parser.source import Source
+from gullian_parser.lexer import Lexer
+from gullian_parser.parser import Parser
+
+from .module import Module, InstanceRegistry
+from .interface import InterfaceCache
+from .compatibility import TypeCompatibility
+from .resolver import ModuleResolver
+from .symbols import SymbolIndex
+
+def run_steps(steps):
+    # Step generators yield between declarations, synchronous callers just run them to the end
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+@dataclass
+class CachedModule:
+    filepath: str
+    mtime: int
+    digest: str
+    module: Module
+    dependencies: dict[str, Module]
+    # Loaded from an interface without checking its bodies, it's checked from source once loaded itself
+    signatures_only: bool=False
+
+@dataclass
+class Session:
+    modules: dict[str, CachedModule]
+    loading: list[tuple[str, dict[str, Module]]]
+    interfaces: InterfaceCache | None=None
+    compatibility: TypeCompatibility=field(default_factory=TypeCompatibility.new)
+    recover: bool=False
+    jobs: int=1
+    resolver: ModuleResolver=field(default_factory=ModuleResolver.new)
+    instances: InstanceRegistry=field(default_factory=InstanceRegistry.new)
+    symbols: SymbolIndex=field(default_factory=SymbolIndex.new)
+
+    def file_digest(self, filepath: str):
+        with open(filepath, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+
+    def is_fresh(self, cached: CachedModule):
+        mtime = os.stat(cached.filepath).st_mtime_ns
+
+        if mtime != cached.mtime:
+            if self.file_digest(cached.filepath) != cached.digest:
+                return False
+
+            # Touched but not modified, no need to check it again
+            cached.mtime = mtime
+
+        # Dependencies loaded here must not be recorded as dependencies of whatever module is being loaded
+        self.loading.append((cached.filepath, dict()))
+
+        try:
+            for dependency_filepath, dependency in cached.dependencies.items():
+                if self.load_module(dependency_filepath, dependency.name) is not dependency:
+                    return False
+        finally:
+            self.loading.pop()
+
+        return True
+
+    def check_module(self, filepath: str, name: str):
+        return run_steps(self.check_module_steps(filepath, name))
+
+    def check_module_steps(self, filepath: str, name: str):
+        from .checker import Checker
+
+        if any(loading_filepath == filepath for loading_filepath, _ in self.loading):
+            raise ImportError(f"can't import '{name}', circular import of file '{filepath}'.")
+
+        mtime = os.stat(filepath).st_mtime_ns
+
+        with open(filepath, 'rb') as file:
+            data = file.read()
+
+        digest = hashlib.sha256(data).hexdigest()
+        dependencies = dict()
+
+        # Imported modules only need their signatures, their bodies are checked when they are loaded themselves
+        bodies = not self.loading
+        self.loading.append((filepath, dependencies))
+
+        # A module checked again replaces its generics and types, their instances and compatibility pairs go with them
+        self.compatibility.forget(name, self.instances.forget(name))
+
+        try:
+            module = None
+
+            if self.interfaces is not None:
+                module = self.interfaces.load(name, digest, self, bodies=bodies)
+
+            signatures_only = module is not None and not bodies
+
+            if module is not None:
+                self.instances.register_module(module)
+                self.symbols.add_module(module, filepath)
+            else:
+                module = Module.new(name, self.instances)
+                checker = Checker.new(module, self)
+
+                tokens = tuple(Lexer(Source(data.decode()), module.name).lex())
+
+                yield from checker.check_signatures_steps(Parser(Source(tokens), module.name).parse())
+
+                # Importers of this module look its declarations up by qualified name
+                self.symbols.add_module(module, filepath)
+
+                if bodies:
+                    yield from self.check_pending_bodies_steps(filepath, module, data)
+
+                self.checked(filepath, module, digest)
+        except GeneratorExit:
+            # Abandoned half way, the previous result of this file already lost its instances so it's checked again
+            self.modules.pop(filepath, None)
+            self.symbols.forget(name)
+            raise
+        finally:
+            self.loading.pop()
+
+        cached = CachedModule(filepath, mtime, digest, module, dependencies, signatures_only)
+        self.modules[filepath] = cached
+
+        return cached
+
+    def checked(self, filepath: str, module: Module, digest: str):
+        for diagnostic in module.diagnostics:
+            diagnostic.filepath = filepath
+
+        # Broken modules are not cached, so sessions that don't recover still see their errors.
+        # Imported modules are stored after their signature pass, marked as such, and stored again once their bodies are checked
+        if self.interfaces is not None and not module.diagnostics:
+            self.interfaces.store(module, digest, self)
+
+    def check_pending_bodies(self, filepath: str, module: Module, data: bytes):
+        run_steps(self.check_pending_bodies_steps(filepath, module, data))
+
+    def check_pending_bodies_steps(self, filepath: str, module: Module, data: bytes):
+        from .checker import Checker
+        from . import parallel
+
+        if self.jobs > 1 and len(module.pending_bodies) >= parallel.THRESHOLD:
+            parallel.check_bodies(self, filepath, module, data, self.jobs)
+            yield
+
+        yield from Checker.new(module, self).check_bodies_steps()
+
+    def check_bodies(self, cached: CachedModule):
+        run_steps(self.check_bodies_steps(cached))
+
+    def check_bodies_steps(self, cached: CachedModule):
+        with open(cached.filepath, 'rb') as file:
+            data = file.read()
+
+        yield from self.check_pending_bodies_steps(cached.filepath, cached.module, data)
+        self.checked(cached.filepath, cached.module, cached.digest)
+
+    def load_module(self, filepath: str, name: str):
+        return run_steps(self.load_module_steps(filepath, name))
+
+    def load_module_steps(self, filepath: str, name: str):
+        filepath = os.path.abspath(filepath)
+        cached = self.modules.get(filepath)
+
+        if cached is None or not self.is_fresh(cached) or (not self.loading and cached.signatures_only):
+            cached = yield from self.check_module_steps(filepath, name)
+        elif not self.loading and cached.module.pending_bodies:
+            yield from self.check_bodies_steps(cached)
+
+        if self.loading:
+            _, dependencies = self.loading[-1]
+            dependencies[filepath] = cached.module
+
+        return cached.module
+
+    @classmethod
+    def new(cls, cache_directory: str=None, *, recover=False, jobs=1, roots: list[str]=None):
+        if cache_directory is None:
+            return cls(dict(), list(), recover=recover, jobs=jobs, resolver=ModuleResolver.new(roots))
+
+        return cls(dict(), list(), InterfaceCache(cache_directory), recover=recover, jobs=jobs, resolver=ModuleResolver.new(roots))
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+
+from .module import Module, Type, GenericType, Function, AssociatedFunction, GenericFunction
+
+def name_format(name):
+    return getattr(name, 'format', name)
+
+def definition_line(target):
+    if type(target) is Type or type(target) is GenericType:
+        return getattr(target.name, 'line', None)
+
+    return getattr(target.declaration.head.name, 'line', None)
+
+@dataclass(slots=True)
+class Symbol:
+    name: str
+    kind: str
+    module_name: str
+    filepath: str
+    line: int
+    target: "Type | GenericType | Function | AssociatedFunction | GenericFunction"
+
+# Every declaration of the checked modules by its fully qualified name, like std.err.Result.unwrap
+@dataclass(slots=True)
+class SymbolIndex:
+    symbols: dict[str, Symbol]
+    modules: dict[str, list[str]]
+
+    def add(self, name: str, kind: str, module: Module, filepath: str, target):
+        self.symbols[name] = Symbol(name, kind, module.name, filepath, definition_line(target), target)
+        self.modules[module.name].append(name)
+
+    def add_module(self, module: Module, filepath: str=None):
+        self.forget(module.name)
+        self.modules[module.name] = list()
+
+        for name, function in module.functions.items():
+            self.add(f'{module.name}.{name_format(name)}', 'function', module, filepath, function)
+
+        for name, type_ in module.types.items():
+            self.add(f'{module.name}.{name_format(name)}', 'type', module, filepath, type_)
+
+            for function_name, function in type_.functions.items():
+                self.add(f'{module.name}.{name_format(name)}.{name_format(function_name)}', 'function', module, filepath, function)
+
+        # Declared on basic types, like std.fmt.int.to_string
+        for (type_name, function_name), function in module.basic_functions.items():
+            self.add(f'{module.name}.{type_name}.{name_format(function_name)}', 'function', module, filepath, function)
+
+    def forget(self, module_name: str):
+        for name in self.modules.pop(module_name, ()):
+            self.symbols.pop(name, None)
+
+    def find(self, name: str):
+        return self.symbols.get(name)
+
+    def resolve(self, module: Module, member: str):
+        symbol = self.symbols.get(f'{module.name}.{member}')
+
+        if symbol is None:
+            return None
+
+        return symbol.target
+
+    @classmethod
+    def new(cls):
+        return cls(dict(), dict())
@@ -0,0 +1,24 @@
+import shutil
+import os
+
+import pytest
+
+STD_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'std')
+
+@pytest.fixture
+def write(tmp_path):
+    # Modules are written under tmp_path, the root they are resolved from
+    def write(relative_filepath: str, source: str):
+        filepath = os.path.join(tmp_path, relative_filepath)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with open(filepath, 'w') as file:
+            file.write(source)
+
+        return filepath
+
+    return write
+
+@pytest.fixture
+def std(tmp_path):
+    shutil.copytree(STD_DIRECTORY, tmp_path / 'std')
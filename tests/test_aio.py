@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+import pytest
+
+from gullian_checker.aio import AsyncSession
+from gullian_checker.session import Session
+from gullian_checker.cli import check_file
+from gullian_checker import aio
+
+def source(count: int):
+    functions = list()
+
+    for index in range(count):
+        value = '"broken"' if index % 50 == 0 else str(index)
+        functions.append(f'fun f{index}() : int {{\n    return {value}\n}}\n')
+
+    return '\n'.join(functions)
+
+def messages(diagnostics):
+    return [diagnostic.format for diagnostic in diagnostics]
+
+def test_cancelled_checks_are_checked_again(tmp_path, write):
+    filepath = write('main.gullian', source(200))
+
+    async def main():
+        async with AsyncSession.new(roots=[str(tmp_path)]) as session:
+            task = asyncio.create_task(session.check_file(filepath))
+
+            # Cancelled once it's half way through the module
+            while not session.session.loading:
+                await asyncio.sleep(0)
+
+            task.cancel()
+
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            assert not session.session.modules
+
+            return await session.check_file(filepath)
+
+    expected = check_file(Session.new(recover=True, roots=[str(tmp_path)]), filepath)
+
+    assert len(expected) == 4
+    assert messages(asyncio.run(main())) == messages(expected)
+
+def test_checks_run_off_the_event_loop(tmp_path, write):
+    filepath = write('main.gullian', source(200))
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    async def main():
+        ticker = asyncio.create_task(tick())
+
+        try:
+            return await aio.check([str(tmp_path)], roots=[str(tmp_path)])
+        finally:
+            ticker.cancel()
+
+    diagnostics = asyncio.run(main())
+
+    assert [diagnostic.filepath for diagnostic in diagnostics] == [os.path.relpath(filepath)] * 4
+    # The loop kept running between declarations
+    assert ticks > 1
@@ -0,0 +1,81 @@
+import pytest
+
+from gullian_checker.session import Session
+from gullian_checker.binary import BinaryModule
+from gullian_checker import binary
+
+SOURCE = '''struct Point {
+    x: int,
+    y: int
+}
+
+fun Point.sum(self: Point) : int {
+    return self.x + self.y
+}
+
+fun main() : int {
+    let point = Point { 1, 2 }
+
+    if point.sum() == 3 {
+        return 0
+    }
+
+    return 1
+}
+'''
+
+def test_checked_bodies_round_trip(tmp_path, write):
+    filepath = write('main.gullian', SOURCE)
+    module = Session.new(roots=[str(tmp_path)]).load_module(filepath, 'main')
+
+    binary.write(module, str(tmp_path / 'main.gulc'))
+
+    with BinaryModule.open(str(tmp_path / 'main.gulc')) as checked:
+        assert checked.name == 'main'
+
+        main = checked.function('main.main')
+        assert main['kind'] == 'function'
+        assert main['parameters'] == []
+        assert checked.types[main['return_type']]['name'] == 'int'
+
+        variable, if_, return_ = main['body']['lines']
+        assert variable['node'] == 'variable' and variable['name'] == 'point'
+        assert checked.types[variable['value']['type']]['name'] == 'Point'
+        assert [field_name for field_name, _ in checked.types[variable['value']['type']]['fields']] == ['x', 'y']
+
+        assert if_['node'] == 'if' and variable['line'] < if_['line'] < return_['line']
+        assert if_['condition']['node'] == 'binary' and checked.types[if_['condition']['type']]['name'] == 'bool'
+        assert if_['condition']['left']['node'] == 'call' and if_['condition']['left']['function'] == 'main.Point.sum'
+        assert return_['value'] == {'node': 'literal', 'line': return_['line'], 'value': 1, 'type': main['return_type']}
+
+        sum_ = checked.function('main.Point.sum')
+        assert sum_['kind'] == 'associated'
+        assert checked.types[sum_['associated_type']]['name'] == 'Point'
+        assert sum_['body']['lines'][0]['value']['operator'] == 'Plus'
+
+def test_deep_expressions_are_encoded_without_recursion(tmp_path, write):
+    depth = 5000
+    filepath = write('deep.gullian', f"fun main(a: int) : int {{\n    return a{' + 1' * depth}\n}}\n")
+    module = Session.new(roots=[str(tmp_path)]).load_module(filepath, 'deep')
+
+    value = BinaryModule(binary.dumps(module)).function('deep.main')['body']['lines'][0]['value']
+    nesting = 0
+
+    while value['node'] == 'binary':
+        value = value['left']
+        nesting += 1
+
+    assert nesting == depth
+    assert value['name'] == 'a'
+
+def test_modules_loaded_without_bodies_are_not_written(tmp_path, write):
+    filepath = write('main.gullian', SOURCE)
+    cache_directory = str(tmp_path / '.cache')
+
+    Session.new(cache_directory, roots=[str(tmp_path)]).load_module(filepath, 'main')
+
+    # Checked before, so this session only has its interface
+    module = Session.new(cache_directory, roots=[str(tmp_path)]).load_module(filepath, 'main')
+
+    with pytest.raises(ValueError):
+        binary.dumps(module)
@@ -0,0 +1,55 @@
+from gullian_checker.incremental import IncrementalChecker
+from gullian_checker.pipeline import parse
+from gullian_checker.session import Session
+from gullian_checker.module import Module
+
+def declarations(source: str):
+    return list(parse(source, 'main'))
+
+def rechecked_keys(rechecked):
+    return {key for key, _ in rechecked}
+
+def new():
+    session = Session.new(recover=True)
+
+    return IncrementalChecker.new(Module.new('main', session.instances), session)
+
+def test_body_changes_keep_the_function_and_its_callers():
+    incremental = new()
+    incremental.update(declarations('fun f(a: int) : int {\n    return a\n}\n\nfun g() : int {\n    return f(1)\n}\n'))
+    f = incremental.module.functions['f']
+    g = incremental.module.functions['g']
+
+    rechecked = incremental.update(declarations('fun f(a: int) : int {\n    return a + 1\n}\n\nfun g() : int {\n    return f(1)\n}\n'))
+
+    assert rechecked_keys(rechecked) == {('function', 'f')}
+    assert incremental.module.functions['f'] is f
+    assert incremental.module.functions['g'] is g
+    assert incremental.module.diagnostics == []
+
+def test_signature_changes_check_their_users_again():
+    incremental = new()
+    incremental.update(declarations('fun f(a: int) : int {\n    return a\n}\n\nfun g() : int {\n    return f(1)\n}\n\nfun h() : int {\n    return 0\n}\n'))
+
+    rechecked = incremental.update(declarations('fun f(a: int) : str {\n    return "a"\n}\n\nfun g() : int {\n    return f(1)\n}\n\nfun h() : int {\n    return 0\n}\n'))
+
+    assert rechecked_keys(rechecked) == {('function', 'f'), ('function', 'g')}
+    assert [diagnostic.module for diagnostic in incremental.module.diagnostics] == ['main']
+
+def test_types_changes_check_their_users_again():
+    incremental = new()
+    incremental.update(declarations('struct Point {\n    x: int\n}\n\nfun x(point: Point) : int {\n    return point.x\n}\n\nfun zero() : int {\n    return 0\n}\n'))
+
+    rechecked = incremental.update(declarations('struct Point {\n    x: int,\n    y: int\n}\n\nfun x(point: Point) : int {\n    return point.x\n}\n\nfun zero() : int {\n    return 0\n}\n'))
+
+    assert rechecked_keys(rechecked) == {('type', 'Point'), ('function', 'x')}
+    assert incremental.module.functions['x'].head.parameters[0][1] is incremental.module.types['Point']
+
+def test_removed_declarations_are_forgotten():
+    incremental = new()
+    incremental.update(declarations('fun f() : int {\n    return 0\n}\n\nfun g() : int {\n    return 1\n}\n'))
+
+    incremental.update(declarations('fun g() : int {\n    return 1\n}\n'))
+
+    assert 'f' not in incremental.module.functions
+    assert [key for key in incremental.declarations] == [('function', 'g')]
@@ -0,0 +1,37 @@
+from gullian_checker.session import Session
+from gullian_checker.module import BASIC_TYPES
+from gullian_checker.cli import check_file
+
+def check(root, cache_directory, filepath: str):
+    session = Session.new(cache_directory, recover=True, roots=[str(root)])
+
+    return [diagnostic.message for diagnostic in check_file(session, filepath)]
+
+def test_generic_instances_of_imported_modules_keep_their_identity(tmp_path, std, write):
+    cache_directory = str(tmp_path / '.cache')
+
+    write('pkg/b.gullian', 'import std.err\n\nfun mk() : err.Result[int, str] {\n    return err.Result[int, str] { 1 }\n}\n')
+    source = 'import pkg.b\nimport std.err\n\nfun take(x: err.Result[int, str]) : int {\n    return 0\n}\n\nfun main() : int {\n    return take(b.mk())\n}\n'
+    filepath = write('c.gullian', source)
+
+    assert check(tmp_path, cache_directory, filepath) == []
+
+    # Changed, so c is checked again while pkg.b comes from the interface cache
+    write('c.gullian', source + '\n')
+
+    assert check(tmp_path, cache_directory, filepath) == []
+
+def test_functions_on_basic_types_are_loaded_with_their_module(tmp_path, std, write, monkeypatch):
+    cache_directory = str(tmp_path / '.cache')
+
+    source = 'import std.fmt\n\nfun main() : str {\n    let x = 1\n\n    return x.to_string()\n}\n'
+    filepath = write('d.gullian', source)
+
+    assert check(tmp_path, cache_directory, filepath) == []
+
+    write('d.gullian', source + '\n')
+
+    # As in a fresh process, where std.fmt only comes from its interface. Basic types are global, so they get their functions back afterwards
+    monkeypatch.setattr(BASIC_TYPES['int'], 'functions', dict())
+
+    assert check(tmp_path, cache_directory, filepath) == []
@@ -0,0 +1,48 @@
+from gullian_checker.session import Session
+from gullian_checker import parallel
+
+COUNT = parallel.THRESHOLD + 16
+
+def source():
+    functions = ['fun ident[T](value: T) : T {\n    return value\n}\n']
+
+    for index in range(COUNT):
+        # Every function calls the next one, so bodies use functions checked by other workers
+        value = '"broken"' if index % 10 == 0 else f'f{(index + 1) % COUNT}(b)'
+        functions.append(f'fun f{index}(a: int) : int {{\n    let b = ident[int](a)\n\n    return b + {value}\n}}\n')
+
+    return '\n'.join(functions)
+
+def check(tmp_path, filepath: str, jobs: int):
+    session = Session.new(recover=True, jobs=jobs, roots=[str(tmp_path)])
+
+    return session.load_module(filepath, 'many')
+
+def shape(module):
+    # What the checked bodies look like, independent of which process checked them
+    return [(name, [(type(line).__name__, getattr(getattr(line.value, 'type', None), 'name', None)) for line in function.declaration.body.lines]) for name, function in module.functions.items() if name != 'ident']
+
+def test_parallel_bodies_match_serial_ones(tmp_path, write):
+    filepath = write('many.gullian', source())
+
+    serial = check(tmp_path, filepath, 1)
+    parallel_ = check(tmp_path, filepath, 2)
+
+    assert [diagnostic.format for diagnostic in parallel_.diagnostics] == [diagnostic.format for diagnostic in serial.diagnostics]
+    assert len(serial.diagnostics) == len(range(0, COUNT, 10))
+    assert shape(parallel_) == shape(serial)
+
+def test_parallel_bodies_share_instances_and_functions(tmp_path, write):
+    module = check(tmp_path, write('many.gullian', source()), 2)
+    ident = module.functions['ident']
+
+    assert len(ident.instances) == 1
+
+    for index in range(1, COUNT):
+        variable, return_ = module.functions[f'f{index}'].declaration.body.lines
+
+        # Merged calls point at the parent's objects, not at copies from the workers
+        assert variable.value.ast.function is ident.instances[tuple(variable.value.ast.function.head.generic)]
+
+        if index % 10:
+            assert return_.value.ast.right.ast.function is module.functions[f'f{(index + 1) % COUNT}']
@@ -0,0 +1,49 @@
+import pytest
+
+from gullian_checker.session import Session
+from gullian_checker.cli import check_file
+
+SOURCE = '''struct Point {
+    x: Missing
+}
+
+fun first() : int {
+    let a = unknown(1)
+    let b = a.field.other
+
+    return b + 1
+}
+
+fun second() : int {
+    return "text"
+}
+
+fun third(point: Point) : int {
+    return point.x
+}
+'''
+
+def test_every_error_is_reported_once(tmp_path, write):
+    filepath = write('main.gullian', SOURCE)
+    diagnostics = check_file(Session.new(recover=True, roots=[str(tmp_path)]), filepath)
+
+    # The unknown type is reported at the struct, the unknown call once, and the uses of what they poisoned not at all
+    assert [diagnostic.kind for diagnostic in diagnostics] == ['NameError', 'AttributeError', 'TypeError']
+    assert diagnostics[0].line < diagnostics[1].line < diagnostics[2].line
+    assert all(diagnostic.module == 'main' and diagnostic.filepath.endswith('main.gullian') for diagnostic in diagnostics)
+    assert 'Missing' in diagnostics[0].message and 'unknown' in diagnostics[1].message
+
+def test_checking_stops_at_the_first_error_without_recovery(tmp_path, write):
+    filepath = write('main.gullian', SOURCE)
+
+    with pytest.raises(NameError, match='Missing'):
+        Session.new(roots=[str(tmp_path)]).load_module(filepath, 'main')
+
+def test_modules_with_diagnostics_are_not_cached(tmp_path, write):
+    filepath = write('main.gullian', SOURCE)
+    cache_directory = str(tmp_path / '.cache')
+
+    first = check_file(Session.new(cache_directory, recover=True, roots=[str(tmp_path)]), filepath)
+
+    # Reported again by a new session, a cached interface would have none
+    assert check_file(Session.new(cache_directory, recover=True, roots=[str(tmp_path)]), filepath) == first
@@ -0,0 +1,61 @@
+import os
+
+from gullian_checker.resolver import ModuleResolver
+
+def test_earlier_roots_shadow_later_ones(tmp_path, write):
+    project = write('project/pkg/lib.gullian', '')
+    write('vendor/pkg/lib.gullian', '')
+    vendored = write('vendor/pkg/other.gullian', '')
+
+    resolver = ModuleResolver.new([str(tmp_path / 'project'), str(tmp_path / 'vendor')])
+
+    assert resolver.resolve('pkg.lib') == project
+    assert resolver.resolve('pkg.other') == vendored
+    assert resolver.resolve('pkg.missing') is None
+
+def test_hidden_directories_are_not_indexed(tmp_path, write):
+    write('.cache/lib.gullian', '')
+    write('.git/lib.gullian', '')
+
+    assert ModuleResolver.new([str(tmp_path)]).resolve('lib') is None
+
+def test_added_modules_make_the_index_stale(tmp_path, write):
+    write('pkg/lib.gullian', '')
+
+    # Old enough that adding a file is seen whatever the resolution of the file system clock
+    os.utime(tmp_path / 'pkg', ns=(0, 0))
+
+    resolver = ModuleResolver.new([str(tmp_path)])
+
+    assert resolver.resolve('pkg.new') is None
+    assert not resolver.is_stale()
+
+    filepath = write('pkg/new.gullian', '')
+
+    assert resolver.is_stale()
+
+    resolver.refresh()
+
+    assert resolver.resolve('pkg.new') == filepath
+    assert not resolver.is_stale()
+
+def test_removed_directories_make_the_index_stale(tmp_path, write):
+    filepath = write('pkg/lib.gullian', '')
+    resolver = ModuleResolver.new([str(tmp_path)])
+    resolver.build()
+
+    os.remove(filepath)
+    os.rmdir(tmp_path / 'pkg')
+
+    assert resolver.is_stale()
+
+    resolver.refresh()
+
+    assert resolver.resolve('pkg.lib') is None
+
+def test_module_names_come_from_the_first_root_containing_the_file(tmp_path, write):
+    filepath = write('project/pkg/lib.gullian', '')
+    resolver = ModuleResolver.new([str(tmp_path / 'project'), str(tmp_path)])
+
+    assert resolver.module_name(filepath) == 'pkg.lib'
+    assert resolver.module_name(str(tmp_path / 'elsewhere' / 'main.gullian')) == 'elsewhere.main'
@@ -0,0 +1,53 @@
+import os
+
+from gullian_checker.session import Session
+from gullian_checker.cli import check_file
+
+SOURCE = '''import std.err
+import std.fmt
+
+struct Point {
+    x: int
+}
+
+fun Point.describe(self: Point) : str {
+    return self.x.to_string()
+}
+
+fun main() : int {
+    let result = err.Result[int, str] { 1 }
+
+    return result.unwrap[int, str]()
+}
+'''
+
+def test_declarations_are_found_by_qualified_name(tmp_path, std, write):
+    filepath = write('main.gullian', SOURCE)
+    session = Session.new(recover=True, roots=[str(tmp_path)])
+
+    assert check_file(session, filepath) == []
+
+    main = session.symbols.find('main.main')
+    assert (main.kind, main.module_name, main.filepath) == ('function', 'main', os.path.abspath(filepath))
+    assert main.target is session.modules[os.path.abspath(filepath)].module.functions['main']
+
+    assert session.symbols.find('main.Point').kind == 'type'
+    assert session.symbols.find('main.Point.describe').kind == 'function'
+    assert session.symbols.find('main.Point').line < session.symbols.find('main.Point.describe').line < main.line
+
+    # Imported modules are indexed too, with the functions they declare on basic types
+    assert session.symbols.find('std.err.Result.unwrap').module_name == 'std.err'
+    assert session.symbols.find('std.fmt.int.to_string').filepath == str(tmp_path / 'std' / 'fmt.gullian')
+    assert session.symbols.find('main.missing') is None
+
+def test_checked_again_modules_replace_their_symbols(tmp_path, std, write):
+    filepath = write('main.gullian', SOURCE)
+    session = Session.new(recover=True, roots=[str(tmp_path)])
+    check_file(session, filepath)
+
+    write('main.gullian', SOURCE.replace('fun main()', 'fun start()'))
+    check_file(session, filepath)
+
+    assert session.symbols.find('main.main') is None
+    assert session.symbols.find('main.start').target is session.modules[os.path.abspath(filepath)].module.functions['start']
+    assert session.symbols.find('main.Point.describe') is not None